@@ -1,5 +1,34 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.authtoken.models import Token
+
+        from recipes.models import (Cart, Favorite, IngredientInRecipe, Recipe,
+                                    TagInRecipe)
+
+        from .authentication import invalidate_token, invalidate_user_tokens
+        from .changes import (recipe_deleted, recipe_part_changed,
+                              recipe_relations_changed, recipe_saved,
+                              relation_deleted, relation_saved)
+        from .query_budget import install_query_counter
+
+        connection_created.connect(install_query_counter)
+        post_delete.connect(invalidate_token, sender=Token)
+        post_save.connect(invalidate_user_tokens, sender=get_user_model())
+        post_save.connect(recipe_saved, sender=Recipe)
+        post_delete.connect(recipe_deleted, sender=Recipe)
+        for model in (IngredientInRecipe, TagInRecipe):
+            post_save.connect(recipe_part_changed, sender=model)
+            post_delete.connect(recipe_part_changed, sender=model)
+        for through in (Recipe.tags.through, Recipe.ingredients.through):
+            m2m_changed.connect(recipe_relations_changed, sender=through)
+        for model in (Favorite, Cart):
+            post_save.connect(relation_saved, sender=model)
+            post_delete.connect(relation_deleted, sender=model)
@@ -0,0 +1,43 @@
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .profiling import start_profiling, stop_profiling
+
+
+def _render(view, request, *args, **kwargs):
+    start_profiling(request, view)
+    try:
+        response = view(request, *args, **kwargs)
+        # Кэшированные списки справочников уже отрендерены в HttpResponse.
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        return response
+    finally:
+        stop_profiling(request)
+        close_old_connections()
+
+
+def async_view(viewset, actions):
+    """
+    Асинхронная обёртка над вьюсетом для запуска под ASGI.
+
+    Django 3.2 выполняет синхронные представления в одном общем потоке,
+    поэтому под ASGI чтения выстраиваются в очередь друг за другом.
+    Безопасные запросы здесь уходят в пул потоков и выполняются
+    параллельно, пока цикл событий отдаёт ответы медленным клиентам.
+    Изменяющие запросы остаются в общем потоке, как и раньше.
+    """
+    view = viewset.as_view(actions)
+
+    async def wrapped_view(request, *args, **kwargs):
+        thread_sensitive = request.method not in SAFE_METHODS
+        return await sync_to_async(_render, thread_sensitive=thread_sensitive)(
+            view, request, *args, **kwargs
+        )
+
+    wrapped_view.csrf_exempt = True
+    # По ним middleware находят бюджет запросов и имя для профиля.
+    wrapped_view.cls = view.cls
+    wrapped_view.actions = view.actions
+    return wrapped_view
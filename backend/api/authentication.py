@@ -0,0 +1,113 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+class LocalTokenCache:
+    """ LRU-кэш токенов в памяти процесса с ограниченным временем жизни """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def set(self, key, user):
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SharedTokenCache:
+    """ Кэш токенов в общем бэкенде кэша Django для нескольких процессов """
+
+    prefix = 'auth_token:'
+
+    def __init__(self, ttl, alias):
+        self.ttl = ttl
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(self.prefix + key)
+
+    def set(self, key, user):
+        self.cache.set(self.prefix + key, user, self.ttl)
+
+    def delete(self, key):
+        self.cache.delete(self.prefix + key)
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        options = settings.TOKEN_AUTH_CACHE
+        if options['BACKEND'] == 'shared':
+            _token_cache = SharedTokenCache(
+                options['TTL'], options['CACHE_ALIAS']
+            )
+        else:
+            _token_cache = LocalTokenCache(options['TTL'], options['MAX_SIZE'])
+    return _token_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену без запроса к базе на каждый запрос:
+    соответствие токена пользователю кэшируется на TOKEN_AUTH_CACHE['TTL']
+    секунд. Записи сбрасываются при удалении токена, сохранении
+    пользователя (смена пароля, блокировка) и его удалении.
+    """
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        user = token_cache.get(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+            return user, token
+        user = copy.copy(user)
+        return user, self.get_model()(key=key, user=user)
+
+
+def invalidate_token(sender, instance, **kwargs):
+    get_token_cache().delete(instance.key)
+
+
+def invalidate_user_tokens(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    from rest_framework.authtoken.models import Token
+    for key in Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ):
+        get_token_cache().delete(key)
@@ -0,0 +1,134 @@
+"""
+Журнал изменений для инкрементальной синхронизации клиентов.
+
+Изменения копятся в памяти до конца транзакции, схлопываются по ключу
+(тип, рецепт, пользователь) и записываются одним INSERT после фиксации,
+так что создание рецепта с десятком ингредиентов даёт одну запись журнала.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from foodgram.transactions import OnCommitBatch
+from recipes.models import (Cart, Favorite, Recipe, RecipeChange,
+                            RecipeChangeHorizon)
+
+RELATION_KINDS = {
+    Favorite: RecipeChange.FAVORITE,
+    Cart: RecipeChange.CART,
+}
+
+
+def write_changes(items):
+    # Повторы одного ключа схлопываются до последнего действия.
+    RecipeChange.objects.bulk_create(
+        RecipeChange(
+            kind=kind, recipe_id=recipe_id, user_id=user_id, action=action
+        )
+        for (kind, recipe_id, user_id), action in dict(items).items()
+    )
+
+
+pending_changes = OnCommitBatch(write_changes)
+
+
+def record_change(kind, recipe_id, action, user_id=None):
+    pending_changes.add(((kind, recipe_id, user_id), action))
+
+
+def record_relations(model, user, recipe_ids, action=RecipeChange.CHANGED):
+    """ Изменения для операций, которые не отправляют сигналы """
+    kind = RELATION_KINDS.get(model)
+    if kind is None:
+        return
+    for recipe_id in recipe_ids:
+        record_change(kind, recipe_id, action, user.id)
+
+
+def recipe_saved(sender, instance, **kwargs):
+    record_change(RecipeChange.RECIPE, instance.id, RecipeChange.CHANGED)
+
+
+def recipe_deleted(sender, instance, **kwargs):
+    record_change(RecipeChange.RECIPE, instance.id, RecipeChange.DELETED)
+
+
+def recipe_part_changed(sender, instance, **kwargs):
+    record_change(
+        RecipeChange.RECIPE, instance.recipe_id, RecipeChange.CHANGED
+    )
+
+
+def recipe_relations_changed(sender, instance, action, **kwargs):
+    if action.startswith('post_') and isinstance(instance, Recipe):
+        record_change(RecipeChange.RECIPE, instance.id, RecipeChange.CHANGED)
+
+
+def relation_saved(sender, instance, **kwargs):
+    record_change(
+        RELATION_KINDS[sender], instance.recipe_id, RecipeChange.CHANGED,
+        instance.user_id
+    )
+
+
+def relation_deleted(sender, instance, **kwargs):
+    record_change(
+        RELATION_KINDS[sender], instance.recipe_id, RecipeChange.DELETED,
+        instance.user_id
+    )
+
+
+def get_last_cursor():
+    return RecipeChange.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0
+
+
+def is_expired(cursor):
+    horizon = RecipeChangeHorizon.objects.values_list(
+        'last_deleted_id', flat=True
+    ).first() or 0
+    return cursor < horizon
+
+
+def get_changes(user, cursor, limit):
+    """
+    Изменения после курсора: публичные изменения рецептов и изменения
+    избранного и корзины самого пользователя. Повторы одного объекта
+    схлопываются до последнего состояния.
+
+    Записи моложе CHANGES['SAFETY_LAG'] секунд не отдаются, чтобы
+    курсор не перескочил через запись параллельной транзакции, которая
+    получила меньший id, но ещё не зафиксирована.
+    """
+    visible = Q(user_id__isnull=True)
+    if user.is_authenticated:
+        visible |= Q(user_id=user.id)
+    rows = list(
+        RecipeChange.objects.filter(
+            visible,
+            id__gt=cursor,
+            created_at__lte=timezone.now() - timedelta(
+                seconds=settings.CHANGES['SAFETY_LAG']
+            ),
+        )
+        .order_by('id')
+        .values_list('id', 'kind', 'recipe_id', 'action')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        cursor = rows[-1][0]
+    changes = {
+        (kind, recipe_id): action for _, kind, recipe_id, action in rows
+    }
+    return {
+        'cursor': str(cursor),
+        'has_more': has_more,
+        'changes': [
+            {'type': kind, 'id': recipe_id, 'action': action}
+            for (kind, recipe_id), action in changes.items()
+        ],
+    }
@@ -0,0 +1,125 @@
+from .nutrition import get_recipes_totals
+
+RECIPE_FIELDS = (
+    'id', 'name', 'text', 'image', 'cooking_time', 'author', 'ingredients',
+    'is_favorited', 'is_in_shopping_cart', 'tags', 'nutrition',
+)
+RECIPE_NESTED_FIELDS = ('author', 'ingredients', 'tags')
+
+
+class FastRecipeSerializer:
+    """
+    Сериализатор рецептов без механизма полей DRF.
+
+    Формирует ту же структуру, что и RecipeSerializer, напрямую из
+    аннотированного queryset с подгруженными автором, тегами и
+    ингредиентами (см. RecipeViewSet.get_queryset). Набор полей задаётся
+    ключами контекста fields и expand: вложенные объекты, не перечисленные
+    в expand, выводятся в сокращённом виде — только идентификаторы.
+    """
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        fields = self.context.get('fields', RECIPE_FIELDS)
+        expand = self.context.get('expand', RECIPE_NESTED_FIELDS)
+        self.getters = tuple(
+            (
+                name,
+                getattr(
+                    self,
+                    f'get_{name}_id'
+                    if name in RECIPE_NESTED_FIELDS and name not in expand
+                    else f'get_{name}'
+                )
+            )
+            for name in fields
+        )
+
+    @property
+    def data(self):
+        recipes = list(self.instance) if self.many else [self.instance]
+        if any(name == 'nutrition' for name, _ in self.getters):
+            self.nutrition = get_recipes_totals(recipes)
+        if self.many:
+            return [self.to_representation(item) for item in recipes]
+        return self.to_representation(self.instance)
+
+    def to_representation(self, recipe):
+        return {name: getter(recipe) for name, getter in self.getters}
+
+    def get_id(self, recipe):
+        return recipe.id
+
+    def get_name(self, recipe):
+        return recipe.name
+
+    def get_text(self, recipe):
+        return recipe.text
+
+    def get_image(self, recipe):
+        if not recipe.image:
+            return None
+        url = recipe.image.url
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_cooking_time(self, recipe):
+        return recipe.cooking_time
+
+    def get_author(self, recipe):
+        author = recipe.author
+        return {
+            'email': author.email,
+            'id': author.id,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+            'is_subscribed': recipe.is_subscribed,
+        }
+
+    def get_author_id(self, recipe):
+        return recipe.author_id
+
+    def get_ingredients(self, recipe):
+        return [
+            {
+                'id': item.ingredient.id,
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.recipe.all()
+        ]
+
+    def get_ingredients_id(self, recipe):
+        return [
+            {'id': item.ingredient_id, 'amount': item.amount}
+            for item in recipe.recipe.all()
+        ]
+
+    def get_is_favorited(self, recipe):
+        return recipe.is_favorited
+
+    def get_is_in_shopping_cart(self, recipe):
+        return recipe.is_in_shopping_cart
+
+    def get_tags(self, recipe):
+        return [
+            {
+                'id': tag.id,
+                'name': tag.name,
+                'color': tag.color,
+                'slug': tag.slug,
+            }
+            for tag in recipe.tags.all()
+        ]
+
+    def get_tags_id(self, recipe):
+        return [item.tag_id for item in recipe.recipe_tags.all()]
+
+    def get_nutrition(self, recipe):
+        return self.nutrition[recipe.id]
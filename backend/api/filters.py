@@ -1,5 +1,6 @@
 from django_filters.rest_framework import FilterSet, filters
 
+from recipes.ingredient_index import filter_by_ingredients
 from recipes.models import Ingredient, Recipe, Tag
 
 
@@ -28,6 +29,14 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart',
     )
+    ingredients = filters.ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.all(),
+        method='filter_ingredients',
+    )
+    exclude_ingredients = filters.ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.all(),
+        method='filter_exclude_ingredients',
+    )
 
     class Meta:
         model = Recipe
@@ -36,6 +45,8 @@ class RecipeFilter(FilterSet):
             'tags',
             'is_favorited',
             'is_in_shopping_cart',
+            'ingredients',
+            'exclude_ingredients',
         )
 
     def filter_is_favorited(self, queryset, name, value):
@@ -48,3 +59,9 @@ class RecipeFilter(FilterSet):
             return queryset.filter(
                 recipe_in_shopping_cart__user=self.request.user)
         return queryset
+
+    def filter_ingredients(self, queryset, name, value):
+        return filter_by_ingredients(queryset, include=value)
+
+    def filter_exclude_ingredients(self, queryset, name, value):
+        return filter_by_ingredients(queryset, exclude=value)
@@ -0,0 +1,189 @@
+import http.client
+import os
+import shlex
+import socket
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .startup_benchmark import get_free_port, wait_for_response
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class SlowClient(threading.Thread):
+    """
+    Клиент на медленном канале: отправляет запрос по байту, растягивая его
+    на duration секунд, и повторяет, пока его не остановят. Пока запрос
+    не дочитан, синхронный воркер занят только этим соединением.
+    """
+
+    def __init__(self, port, request, duration, stop):
+        super().__init__(daemon=True)
+        self.port = port
+        self.request = request
+        self.delay = duration / len(request)
+        self.stop = stop
+
+    def run(self):
+        while not self.stop.is_set():
+            try:
+                with socket.create_connection(
+                    ('127.0.0.1', self.port), timeout=60
+                ) as sock:
+                    for byte in self.request:
+                        if self.stop.is_set():
+                            return
+                        sock.sendall(bytes((byte,)))
+                        time.sleep(self.delay)
+                    while sock.recv(65536):
+                        pass
+            except OSError:
+                time.sleep(0.1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест: пропускная способность и задержки запросов к '
+        'API при одновременной работе медленных клиентов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server',
+            default='gunicorn foodgram.wsgi:application',
+            help='Команда запуска сервера, адрес добавляется через --bind.',
+        )
+        parser.add_argument(
+            '--env',
+            action='append',
+            default=[],
+            metavar='NAME=VALUE',
+            help='Переменная окружения сервера, можно указать несколько раз.',
+        )
+        parser.add_argument(
+            '--path',
+            default='/api/recipes/',
+            help='Запрос, задержку которого измерять.',
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен для заголовка Authorization.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Сколько запросов выполнить.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Сколько запросов выполнять одновременно.',
+        )
+        parser.add_argument(
+            '--slow-clients',
+            type=int,
+            default=0,
+            help='Сколько медленных клиентов держать на сервере.',
+        )
+        parser.add_argument(
+            '--slow-duration',
+            type=float,
+            default=5,
+            help='За сколько секунд медленный клиент отправляет запрос.',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Сколько секунд ждать запуска сервера и ответа на запрос.',
+        )
+
+    def handle(self, *args, **options):
+        port = get_free_port()
+        env = dict(os.environ)
+        for item in options['env']:
+            name, _, value = item.partition('=')
+            env[name] = value
+        server = subprocess.Popen(
+            shlex.split(options['server']) + ['--bind', f'127.0.0.1:{port}'],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            cwd=settings.BASE_DIR,
+        )
+        stop = threading.Event()
+        try:
+            if wait_for_response(
+                f'http://127.0.0.1:{port}/api/tags/', options['timeout']
+            ) is None:
+                raise CommandError(
+                    f'Сервер не ответил за {options["timeout"]} с'
+                )
+            headers = {}
+            if options['token']:
+                headers['Authorization'] = f'Token {options["token"]}'
+            request = (
+                f'GET {options["path"]} HTTP/1.1\r\n'
+                f'Host: 127.0.0.1\r\nConnection: close\r\n'
+                + ''.join(
+                    f'{name}: {value}\r\n' for name, value in headers.items()
+                )
+                + '\r\n'
+            ).encode()
+            for _ in range(options['slow_clients']):
+                SlowClient(
+                    port, request, options['slow_duration'], stop
+                ).start()
+            self.run_requests(port, headers, options)
+        finally:
+            stop.set()
+            server.terminate()
+            server.wait()
+
+    def run_requests(self, port, headers, options):
+        def fetch(_):
+            started = time.monotonic()
+            connection = http.client.HTTPConnection(
+                '127.0.0.1', port, timeout=options['timeout']
+            )
+            try:
+                connection.request('GET', options['path'], headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                ok = False
+            finally:
+                connection.close()
+            return ok, time.monotonic() - started
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            results = list(executor.map(fetch, range(options['requests'])))
+        elapsed = time.monotonic() - started
+        timings = [timing * 1000 for ok, timing in results if ok]
+        errors = len(results) - len(timings)
+        if not timings:
+            raise CommandError('Ни один запрос не выполнился успешно')
+        self.stdout.write(
+            f'Запросов: {len(results)}, ошибок: {errors}, '
+            f'медленных клиентов: {options["slow_clients"]}'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(timings) / elapsed:.1f} запросов/с, '
+            f'медиана {statistics.median(timings):.0f} мс, '
+            f'p95 {percentile(timings, 0.95):.0f} мс, '
+            f'p99 {percentile(timings, 0.99):.0f} мс, '
+            f'максимум {max(timings):.0f} мс'
+        ))
@@ -0,0 +1,49 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+STATIC_STAMP = '.collectstatic'
+
+
+def get_static_fingerprint():
+    """ Хэш путей, размеров и времени изменения исходной статики """
+    entries = []
+    for finder in finders.get_finders():
+        for path, storage in finder.list(['CVS', '.*', '*~']):
+            stat = os.stat(storage.path(path))
+            entries.append(f'{path}:{stat.st_size}:{stat.st_mtime}')
+    return hashlib.md5('\n'.join(sorted(entries)).encode()).hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        'Подготовка контейнера к запуску: применяет миграции и собирает '
+        'статику, только если есть что применять и собирать.'
+    )
+    # Проверки загружают URLconf со всеми представлениями, а здесь
+    # они не нужны: запуск контейнера и так ждёт эту команду.
+    requires_system_checks = []
+
+    def handle(self, *args, **options):
+        executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+        if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+            call_command('migrate', interactive=False)
+        else:
+            self.stdout.write('Новых миграций нет')
+
+        stamp_path = os.path.join(settings.STATIC_ROOT, STATIC_STAMP)
+        fingerprint = get_static_fingerprint()
+        if os.path.exists(stamp_path):
+            with open(stamp_path) as file:
+                if file.read() == fingerprint:
+                    self.stdout.write('Статика не изменилась')
+                    return
+        call_command('collectstatic', interactive=False)
+        with open(stamp_path, 'w') as file:
+            file.write(fingerprint)
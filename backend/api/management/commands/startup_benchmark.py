@@ -0,0 +1,149 @@
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# То же, что делает воркер до ответа на первый запрос.
+IMPORT_CODE = (
+    'import foodgram.wsgi;'
+    'from django.urls import get_resolver;'
+    'get_resolver().url_patterns'
+)
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_response(url, timeout):
+    """ Опрашивает url, пока он не ответит 200, и возвращает время """
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        try:
+            with urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.monotonic() - started
+        except (URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def parse_importtime(output):
+    """ Собственное и полное время импорта модулей в микросекундах """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_time), int(cumulative)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет холодный старт: время от запуска сервера до первого '
+        'успешного ответа API и время импорта модулей по пакетам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            help='Сколько раз запускать сервер.',
+        )
+        parser.add_argument(
+            '--server',
+            default='gunicorn foodgram.wsgi:application',
+            help='Команда запуска сервера, адрес добавляется через --bind.',
+        )
+        parser.add_argument(
+            '--path',
+            default='/api/tags/',
+            help='Запрос, ответ на который считается готовностью.',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Сколько секунд ждать ответа.',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Сколько пакетов и модулей показать в отчёте об импорте.',
+        )
+
+    def handle(self, *args, **options):
+        self.report_cold_start(options)
+        self.report_imports(options['top'])
+
+    def report_cold_start(self, options):
+        timings = []
+        for _ in range(options['runs']):
+            port = get_free_port()
+            server = subprocess.Popen(
+                shlex.split(options['server'])
+                + ['--bind', f'127.0.0.1:{port}'],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                cwd=settings.BASE_DIR,
+            )
+            try:
+                elapsed = wait_for_response(
+                    f'http://127.0.0.1:{port}{options["path"]}',
+                    options['timeout']
+                )
+            finally:
+                server.terminate()
+                server.wait()
+            if elapsed is None:
+                raise CommandError(
+                    f'Сервер не ответил за {options["timeout"]} с'
+                )
+            timings.append(elapsed)
+            self.stdout.write(f'Первый ответ через {elapsed * 1000:.0f} мс')
+        self.stdout.write(self.style.SUCCESS(
+            f'Холодный старт: медиана {statistics.median(timings) * 1000:.0f}'
+            f' мс, минимум {min(timings) * 1000:.0f} мс'
+        ))
+
+    def report_imports(self, top):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', IMPORT_CODE],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+        modules = parse_importtime(result.stderr)
+        packages = defaultdict(int)
+        for name, self_time, _ in modules:
+            packages[name.split('.')[0]] += self_time
+        total = sum(packages.values())
+        self.stdout.write(f'\nИмпорт модулей: {total / 1000:.0f} мс')
+        self.stdout.write('Пакеты по собственному времени импорта:')
+        for package, self_time in sorted(
+            packages.items(), key=lambda item: -item[1]
+        )[:top]:
+            self.stdout.write(
+                f'  {self_time / 1000:8.1f} мс  {package}'
+            )
+        self.stdout.write('Модули по полному времени импорта:')
+        for name, _, cumulative in sorted(
+            modules, key=lambda module: -module[2]
+        )[:top]:
+            self.stdout.write(f'  {cumulative / 1000:8.1f} мс  {name}')
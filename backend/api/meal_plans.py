@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Greatest
+
+from recipes.models import Ingredient, MealPlanEntry
+from recipes.units import build_shopping_list
+
+from .mixins import get_catalog_version
+
+MEAL_PLAN_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def get_plan_entries(plan, date_from=None, date_to=None):
+    entries = MealPlanEntry.objects.filter(plan=plan)
+    if date_from is not None:
+        entries = entries.filter(date__gte=date_from)
+    if date_to is not None:
+        entries = entries.filter(date__lte=date_to)
+    return entries
+
+
+def get_days_keys(plan, entries):
+    """
+    Ключи кэша для каждого дня плана.
+
+    Версия дня складывается из времени последнего изменения его записей
+    и рецептов в них, числа записей и версии справочника ингредиентов,
+    поэтому правка одного дня не сбрасывает посчитанные остальные дни.
+    """
+    ingredients_version = get_catalog_version(Ingredient)
+    days = (
+        entries.values('date')
+        .annotate(
+            version=Greatest(Max('updated_at'), Max('recipe__updated_at')),
+            entries_count=Count('id'),
+        )
+        .order_by()
+    )
+    return {
+        day['date']: (
+            f'meal_plan:{plan.id}:{day["date"].isoformat()}:'
+            f'{day["version"].timestamp()}:{day["entries_count"]}:'
+            f'{ingredients_version}'
+        )
+        for day in days
+    }
+
+
+def get_days_rows(entries, days):
+    """
+    Ингредиенты по дням одним агрегирующим запросом с учётом порций.
+    """
+    rows = (
+        entries.filter(date__in=days, recipe__recipe__isnull=False)
+        .values_list(
+            'date',
+            'recipe__recipe__ingredient__name',
+            'recipe__recipe__ingredient__measurement_unit',
+        )
+        .annotate(amount=Sum(F('recipe__recipe__amount') * F('servings')))
+        .order_by()
+    )
+    days_rows = {day: [] for day in days}
+    for day, name, unit, amount in rows:
+        days_rows[day].append((name, unit, amount))
+    return days_rows
+
+
+def get_plan_shopping_list(plan, date_from=None, date_to=None):
+    entries = get_plan_entries(plan, date_from, date_to)
+    keys = get_days_keys(plan, entries)
+    cached = cache.get_many(keys.values())
+    days_rows = {
+        day: cached[key] for day, key in keys.items() if key in cached
+    }
+    missing = [day for day in keys if day not in days_rows]
+    if missing:
+        computed = get_days_rows(entries, missing)
+        days_rows.update(computed)
+        cache.set_many(
+            {keys[day]: computed[day] for day in missing},
+            MEAL_PLAN_CACHE_TIMEOUT
+        )
+    return build_shopping_list(
+        row for day in sorted(days_rows) for row in days_rows[day]
+    )
@@ -0,0 +1,65 @@
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+
+from foodgram.compression import precompress
+
+
+def get_catalog_version(model):
+    """
+    Версия справочника: число записей и время последнего изменения.
+
+    Считается по базе, а не хранится в кэше, поэтому одинакова во всех
+    воркерах и с кэшем в памяти процесса.
+    """
+    version = model.objects.aggregate(
+        count=Count('pk'), updated_at=Max('updated_at')
+    )
+    updated_at = version['updated_at']
+    return (
+        f'{version["count"]}:'
+        f'{updated_at.timestamp() if updated_at is not None else ""}'
+    )
+
+
+class CachedListMixin:
+    """
+    Кэширует отрендеренный JSON списка справочника вместе со сжатыми
+    вариантами, чтобы не сериализовать и не сжимать его на каждый запрос.
+    Ключ кэша включает версию справочника, так что изменения модели
+    сразу видны во всех воркерах.
+    """
+    list_cache_timeout = 5 * 60
+
+    def get_list_cache_key(self, request):
+        model = self.get_queryset().model
+        version = get_catalog_version(model)
+        return (
+            f'catalog:{model._meta.label_lower}:{version}:'
+            f'{request.get_full_path()}'
+        )
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        key = self.get_list_cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            content = response.render().content
+            cached = {
+                'content': content,
+                'content_type': response['Content-Type'],
+                'precompressed': precompress(content),
+            }
+            cache.set(key, cached, self.list_cache_timeout)
+        response = HttpResponse(
+            cached['content'], content_type=cached['content_type']
+        )
+        response.precompressed = cached['precompressed']
+        return response
@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.db.models import F, Sum
+
+from recipes.models import Cart, Ingredient, IngredientInRecipe
+
+from .mixins import get_catalog_version
+
+NUTRIENTS = ('calories', 'proteins', 'fats', 'carbohydrates', 'price')
+NUTRITION_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def get_totals_expressions(prefix=''):
+    return {
+        name: Sum(F(f'{prefix}amount') * F(f'{prefix}ingredient__{name}'))
+        for name in NUTRIENTS
+    }
+
+
+def format_totals(row):
+    return {
+        name: None if row[name] is None else round(float(row[name]), 2)
+        for name in NUTRIENTS
+    }
+
+
+def get_recipes_totals(recipes):
+    """
+    Пищевая ценность и стоимость рецептов одним агрегирующим запросом.
+
+    Результат кэшируется по версии рецепта (updated_at) и версии
+    справочника ингредиентов, поэтому повторно считаются только изменённые
+    рецепты.
+    """
+    ingredients_version = get_catalog_version(Ingredient)
+    keys = {
+        recipe.id: (
+            f'nutrition:{recipe.id}:{recipe.updated_at.timestamp()}:'
+            f'{ingredients_version}'
+        )
+        for recipe in recipes
+    }
+    cached = cache.get_many(keys.values())
+    totals = {
+        recipe_id: cached[key]
+        for recipe_id, key in keys.items() if key in cached
+    }
+    missing = [recipe_id for recipe_id in keys if recipe_id not in totals]
+    if missing:
+        rows = (
+            IngredientInRecipe.objects.filter(recipe__in=missing)
+            .values('recipe')
+            .annotate(**get_totals_expressions())
+            .order_by()
+        )
+        computed = {row['recipe']: format_totals(row) for row in rows}
+        empty = dict.fromkeys(NUTRIENTS)
+        for recipe_id in missing:
+            totals[recipe_id] = computed.get(recipe_id, empty)
+        cache.set_many(
+            {keys[recipe_id]: totals[recipe_id] for recipe_id in missing},
+            NUTRITION_CACHE_TIMEOUT
+        )
+    return totals
+
+
+def get_cart_totals(user):
+    """ Пищевая ценность и стоимость всей корзины пользователя """
+    return format_totals(
+        Cart.objects.filter(user=user).aggregate(
+            **get_totals_expressions('recipe__recipe__')
+        )
+    )
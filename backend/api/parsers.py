@@ -0,0 +1,101 @@
+import io
+import json
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import \
+    MultiPartParser as DjangoMultiPartParser
+from django.http.multipartparser import MultiPartParserError
+from django.utils.datastructures import MultiValueDict
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import BaseParser, DataAndFiles, JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Слишком большой запрос.'
+    default_code = 'payload_too_large'
+
+
+def check_content_length(parser_context):
+    """ Отклоняет запрос по заголовку Content-Length, не читая тело """
+    limit = settings.PAYLOAD_LIMITS['MAX_BODY_SIZE']
+    try:
+        length = int(parser_context['request'].META.get('CONTENT_LENGTH'))
+    except (TypeError, ValueError):
+        length = 0
+    if length > limit:
+        raise PayloadTooLarge()
+    return limit
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON-парсер на orjson со стандартным парсером DRF в качестве
+    запасного. Тело больше PAYLOAD_LIMITS['MAX_BODY_SIZE'] не читается
+    целиком, даже если клиент не прислал Content-Length.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        limit = check_content_length(parser_context)
+        data = stream.read(limit + 1)
+        if len(data) > limit:
+            raise PayloadTooLarge()
+        if orjson is None:
+            return super().parse(
+                io.BytesIO(data), media_type, parser_context
+            )
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MultiPartData(dict):
+    """
+    Данные JSONMultiPartParser. DRF добавляет к ним файлы через copy() и
+    update(): здесь поле получает сам файл, а не список файлов, как при
+    обновлении обычного dict из MultiValueDict.
+    """
+
+    def copy(self):
+        return MultiPartData(self)
+
+    def update(self, other):
+        if isinstance(other, MultiValueDict):
+            other = other.dict()
+        super().update(other)
+
+
+class JSONMultiPartParser(BaseParser):
+    """
+    multipart/form-data, где поле data содержит JSON, а файлы передаются
+    отдельными частями с именами полей. Файлы пишутся во временные файлы
+    на диске, а не собираются в памяти, остальные поля ограничены
+    DATA_UPLOAD_MAX_MEMORY_SIZE.
+    """
+    media_type = 'multipart/form-data'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        check_content_length(parser_context)
+        request = parser_context['request']
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+        try:
+            fields, files = DjangoMultiPartParser(
+                meta, stream, [TemporaryFileUploadHandler(request)],
+                parser_context.get('encoding', settings.DEFAULT_CHARSET)
+            ).parse()
+        except MultiPartParserError as exc:
+            raise ParseError('Multipart form parse error - %s' % str(exc))
+        try:
+            data = json.loads(fields.get('data') or '{}')
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+        if not isinstance(data, dict):
+            raise ParseError('Поле data должно содержать JSON-объект')
+        return DataAndFiles(MultiPartData(data), files)
@@ -0,0 +1,231 @@
+"""
+Статистический профилировщик запросов к API.
+
+Для выбранных запросов поток обработки регистрируется в Sampler, фоновый
+поток которого раз в PROFILING['INTERVAL'] секунд снимает стеки этих
+потоков через sys._current_frames(). Стеки схлопываются в строки
+``модуль:функция;...`` и считаются по имени представления, а раз в
+PROFILING['FLUSH_INTERVAL'] секунд сливаются в кэш PROFILING['CACHE_ALIAS'],
+откуда администратор скачивает их в формате для flamegraph. Стеки всех
+воркеров собираются вместе только в общем кэше (memcached и т.п.), с кэшем
+по умолчанию в памяти процесса каждый воркер отдаёт только свои.
+"""
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.utils.deprecation import MiddlewareMixin
+
+CACHE_KEY = 'profiling:stacks'
+SIGNING_SALT = 'api.profiling'
+OTHER_STACKS = '[other]'
+
+
+def collapse_stack(frame):
+    """ Стек от корня к вершине: модуль:функция через точку с запятой """
+    names = []
+    while frame is not None:
+        names.append(
+            f'{frame.f_globals.get("__name__", "?")}:{frame.f_code.co_name}'
+        )
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def make_token():
+    """ Значение заголовка X-Profile для профилирования своих запросов """
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def is_valid_token(token):
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            token, max_age=settings.PROFILING['TOKEN_MAX_AGE']
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class Sampler:
+    """
+    Снимает стеки зарегистрированных потоков. Поток сэмплера запускается
+    при первом профилируемом запросе в процессе и спит, пока таких
+    запросов нет.
+    """
+
+    def __init__(self, interval, flush_interval, max_stacks, cache_alias):
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self.max_stacks = max_stacks
+        self.cache_alias = cache_alias
+        self.active = {}
+        self.stacks = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._has_active = threading.Event()
+        self._pid = None
+
+    def start(self, view_name):
+        with self._lock:
+            # После fork поток сэмплера остаётся только в родителе.
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(
+                    target=self.run, name='profiling-sampler', daemon=True
+                ).start()
+            self.active[threading.get_ident()] = view_name
+            self._has_active.set()
+
+    def clear(self):
+        with self._lock:
+            self.stacks.clear()
+        caches[self.cache_alias].delete(CACHE_KEY)
+
+    def stop(self, ident):
+        with self._lock:
+            self.active.pop(ident, None)
+            if not self.active:
+                self._has_active.clear()
+
+    def run(self):
+        flushed_at = time.monotonic()
+        while True:
+            if not self._has_active.wait(self.flush_interval):
+                self.flush()
+                flushed_at = time.monotonic()
+                continue
+            time.sleep(self.interval)
+            self.sample()
+            if time.monotonic() - flushed_at > self.flush_interval:
+                self.flush()
+                flushed_at = time.monotonic()
+
+    def sample(self):
+        frames = sys._current_frames()
+        with self._lock:
+            for ident, view_name in self.active.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = collapse_stack(frame)
+                counter = self.stacks[view_name]
+                if stack not in counter and len(counter) >= self.max_stacks:
+                    stack = OTHER_STACKS
+                counter[stack] += 1
+
+    def flush(self):
+        """
+        Сливает накопленные стеки в кэш. Чтение и запись не атомарны:
+        при одновременном сбросе из двух воркеров часть сэмплов теряется,
+        для профиля это допустимо.
+        """
+        with self._lock:
+            stacks, self.stacks = self.stacks, defaultdict(Counter)
+        if not stacks:
+            return
+        cache = caches[self.cache_alias]
+        merged = cache.get(CACHE_KEY) or {}
+        for view_name, counter in stacks.items():
+            merged.setdefault(view_name, Counter()).update(counter)
+        cache.set(CACHE_KEY, merged, None)
+
+
+_sampler = None
+
+
+def get_sampler():
+    global _sampler
+    if _sampler is None:
+        options = settings.PROFILING
+        _sampler = Sampler(
+            options['INTERVAL'], options['FLUSH_INTERVAL'],
+            options['MAX_STACKS'], options['CACHE_ALIAS']
+        )
+    return _sampler
+
+
+def get_collapsed_stacks(view_name=None):
+    """ Строки «имя_представления;стек число» для flamegraph.pl """
+    sampler = get_sampler()
+    sampler.flush()
+    stacks = caches[sampler.cache_alias].get(CACHE_KEY) or {}
+    return [
+        f'{name};{stack} {count}\n'
+        for name, counter in sorted(stacks.items())
+        if view_name in (None, name)
+        for stack, count in counter.most_common()
+    ]
+
+
+def get_view_name(request, view_func):
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    action = getattr(view_func, 'actions', {}).get(request.method.lower())
+    return f'{cls.__name__}.{action}' if action else cls.__name__
+
+
+def start_profiling(request, view):
+    """
+    Регистрирует в сэмплере текущий поток — тот, что выполняет
+    представление, — если запрос выбран для профилирования.
+    """
+    if getattr(request, 'profile', False) and not hasattr(
+        request, 'profile_thread'
+    ):
+        request.profile_thread = threading.get_ident()
+        get_sampler().start(get_view_name(request, view))
+
+
+def stop_profiling(request):
+    ident = request.__dict__.pop('profile_thread', None)
+    if ident is not None:
+        get_sampler().stop(ident)
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """
+    Профилирует долю PROFILING['RATE'] запросов и запросы с подписанным
+    заголовком X-Profile. С PROFILING['ENABLED'] = False ничего не делает.
+    """
+
+    def should_profile(self, request):
+        options = settings.PROFILING
+        token = request.META.get('HTTP_X_PROFILE')
+        return (
+            random.random() < options['RATE']
+            if token is None else is_valid_token(token)
+        )
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.PROFILING['ENABLED']:
+            return self.get_response(request)
+        request.profile = self.should_profile(request)
+        try:
+            return self.get_response(request)
+        finally:
+            stop_profiling(request)
+
+    async def __acall__(self, request):
+        if not settings.PROFILING['ENABLED']:
+            return await self.get_response(request)
+        request.profile = self.should_profile(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            stop_profiling(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Асинхронные представления (api.async_views) выполняются в другом
+        # потоке и регистрируют его сами.
+        if not asyncio.iscoroutinefunction(view_func):
+            start_profiling(request, view_func)
@@ -0,0 +1,98 @@
+"""
+Бюджет запросов к базе на один запрос к API.
+
+Представление объявляет бюджет атрибутом query_budgets — максимальное
+число запросов по HTTP-методам, для остальных представлений действует
+QUERY_BUDGET['DEFAULT']. Превышение пишется в лог, а с
+QUERY_BUDGET['RAISE'] ещё и прерывает запрос исключением, чтобы N+1 в
+сериализаторах было видно при разработке.
+"""
+import asyncio
+import logging
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+_counter = ContextVar('query_counter', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+
+def count_query(execute, sql, params, many, context):
+    counter = _counter.get()
+    if counter is not None:
+        counter.count += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """
+    Подключает счётчик к каждому новому соединению. Соединения у каждого
+    потока свои, а под ASGI представление выполняется не в том потоке,
+    что middleware, поэтому текущий счётчик передаётся через контекст.
+    """
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class QueryBudgetMiddleware(MiddlewareMixin):
+    """
+    Считает запросы ко всем базам, включая реплики. Запросы потоковых
+    ответов, выполняемые при отдаче тела, не учитываются.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.QUERY_BUDGET['ENABLED']:
+            return self.get_response(request)
+        counter = QueryCounter()
+        token = _counter.set(counter)
+        try:
+            response = self.get_response(request)
+        finally:
+            _counter.reset(token)
+        self.check_budget(request, counter)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.QUERY_BUDGET['ENABLED']:
+            return await self.get_response(request)
+        counter = QueryCounter()
+        token = _counter.set(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _counter.reset(token)
+        self.check_budget(request, counter)
+        return response
+
+    def check_budget(self, request, counter):
+        options = settings.QUERY_BUDGET
+        budget = getattr(request, 'query_budget', None)
+        if budget is None:
+            budget = options['DEFAULT']
+        if counter.count > budget:
+            message = (
+                f'{request.method} {request.path}: {counter.count} '
+                f'запросов к базе при бюджете {budget}'
+            )
+            if options['RAISE']:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budgets = getattr(
+            getattr(view_func, 'cls', None), 'query_budgets', {}
+        )
+        request.query_budget = budgets.get(request.method)
@@ -1,15 +1,32 @@
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import filesizeformat
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
-from rest_framework.serializers import (IntegerField, ModelSerializer,
+from rest_framework.fields import ImageField
+from rest_framework.serializers import (DateField, IntegerField, ListField,
+                                        ModelSerializer,
                                         PrimaryKeyRelatedField, ReadOnlyField,
-                                        SerializerMethodField, ValidationError)
-from rest_framework.validators import UniqueTogetherValidator
+                                        Serializer, SerializerMethodField,
+                                        ValidationError)
+from rest_framework.settings import api_settings
 
+from jobs.queue import enqueue
+from recipes.ingredient_index import get_ingredient_ids
 from recipes.models import (Cart, Favorite, Ingredient, IngredientInRecipe,
-                            Recipe, Tag, TagInRecipe)
+                            MealPlan, MealPlanEntry, Recipe, Tag, TagInRecipe)
+from recipes.recommendations import SIMILARITY_TOP_K
+from recipes.tasks import refresh_recommendations
 from users.models import Subscribe, User
 
+from .nutrition import get_recipes_totals
+
+# Правки рецептов за это время попадут в один пересчёт рекомендаций
+RECOMMENDATIONS_REFRESH_DELAY = 5 * 60
+
 
 class CustomUserSerializer(UserSerializer):
     is_subscribed = SerializerMethodField()
@@ -86,15 +103,19 @@ class RecipeSerializer(ModelSerializer):
         required=True,
         source='recipe'
     )
+    nutrition = SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'name', 'text', 'image', 'cooking_time', 'text', 'author',
-            'ingredients', 'is_favorited', 'is_in_shopping_cart', 'tags'
+            'ingredients', 'is_favorited', 'is_in_shopping_cart', 'tags',
+            'nutrition'
         )
 
     def get_is_favorited(self, instance):
+        if hasattr(instance, 'is_favorited'):
+            return instance.is_favorited
         if self.context['request'].user.is_anonymous:
             return False
         user_id = self.context['request'].user.id
@@ -102,12 +123,40 @@ class RecipeSerializer(ModelSerializer):
         return favorite.exists()
 
     def get_is_in_shopping_cart(self, instance):
+        if hasattr(instance, 'is_in_shopping_cart'):
+            return instance.is_in_shopping_cart
         if self.context['request'].user.is_anonymous:
             return False
         user_id = self.context['request'].user.id
         recipe_in_cart = Cart.objects.filter(user=user_id, recipe=instance)
         return recipe_in_cart.exists()
 
+    def get_nutrition(self, instance):
+        return get_recipes_totals([instance])[instance.id]
+
+
+class RecipeImageField(Base64ImageField):
+    """
+    Изображение строкой base64 в JSON или файлом из multipart-запроса.
+    Размер проверяется до декодирования base64.
+    """
+
+    def to_internal_value(self, data):
+        max_size = settings.PAYLOAD_LIMITS['MAX_IMAGE_SIZE']
+        if isinstance(data, UploadedFile):
+            size = data.size
+        elif isinstance(data, str):
+            size = len(data.split(';base64,')[-1]) * 3 // 4
+        else:
+            size = 0
+        if size > max_size:
+            raise ValidationError(
+                f'Размер изображения больше {filesizeformat(max_size)}'
+            )
+        if isinstance(data, UploadedFile):
+            return ImageField.to_internal_value(self, data)
+        return super().to_internal_value(data)
+
 
 class IngredientInRecipeCreateSerializer(ModelSerializer):
     id = PrimaryKeyRelatedField(
@@ -124,7 +173,7 @@ class IngredientInRecipeCreateSerializer(ModelSerializer):
 class RecipeCreateSerializer(ModelSerializer):
     tags = PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
     ingredients = IngredientInRecipeCreateSerializer(many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -137,33 +186,73 @@ class RecipeCreateSerializer(ModelSerializer):
             'text',
             'cooking_time',
         )
+        extra_kwargs = {
+            'text': {'max_length': settings.PAYLOAD_LIMITS['MAX_TEXT_LENGTH']}
+        }
+
+    def to_internal_value(self, data):
+        # Проверяется до полей: каждый ингредиент и тег ищется в базе
+        # отдельным запросом.
+        limits = (
+            ('ingredients', settings.PAYLOAD_LIMITS['MAX_INGREDIENTS']),
+            ('tags', settings.PAYLOAD_LIMITS['MAX_TAGS']),
+        )
+        for name, limit in limits if isinstance(data, dict) else ():
+            value = data.get(name)
+            if isinstance(value, list) and len(value) > limit:
+                raise ValidationError({name: [f'Не больше {limit} элементов']})
+        return super().to_internal_value(data)
 
     def add_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            IngredientInRecipe.objects.update_or_create(
+        # Повторы ингредиентов отсекает validate, а при обновлении
+        # старые строки удаляются заранее.
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
                 recipe=recipe,
                 ingredient=ingredient['ingredient'],
                 amount=ingredient['amount']
             )
+            for ingredient in ingredients
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context['request'].user
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(author=author, **validated_data)
+        recipe = Recipe.objects.create(
+            author=author,
+            ingredient_ids=get_ingredient_ids(
+                item['ingredient'] for item in ingredients
+            ),
+            **validated_data
+        )
         self.add_ingredients(ingredients, recipe)
         recipe.tags.set(tags)
+        self.enqueue_side_effects()
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
+        validated_data['ingredient_ids'] = get_ingredient_ids(
+            item['ingredient'] for item in ingredients
+        )
         super().update(recipe, validated_data)
         recipe.ingredients.clear()
         self.add_ingredients(ingredients, recipe)
         recipe.tags.set(tags) if tags else None
+        self.enqueue_side_effects()
         return recipe
 
+    def enqueue_side_effects(self):
+        enqueue(
+            refresh_recommendations,
+            dedup_key='refresh_recommendations',
+            delay=RECOMMENDATIONS_REFRESH_DELAY
+        )
+
     def validate(self, data):
         ingredients = data.get("ingredients")
         if not ingredients:
@@ -178,6 +267,10 @@ class RecipeCreateSerializer(ModelSerializer):
         return data
 
     def to_representation(self, recipe):
+        prefetch_related_objects([recipe], Prefetch(
+            'recipe',
+            queryset=IngredientInRecipe.objects.select_related('ingredient')
+        ))
         return RecipeSerializer(
             recipe, context={'request': self.context.get('request')}
         ).data
@@ -190,37 +283,54 @@ class RecipeInFavoriteSerializer(ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
-class FavoriteSerializer(ModelSerializer):
+class UniqueRelationSerializer(ModelSerializer):
+    """
+    Создание связи пользователя с объектом без предварительной проверки
+    на дубликат: уникальность гарантирует ограничение в базе данных.
+    """
+    unique_error_message = None
+
+    def get_owner_data(self):
+        return {'user': self.context.get('request').user}
+
+    def save_unique(self, save, *args):
+        try:
+            with transaction.atomic():
+                return save(*args)
+        except IntegrityError:
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [
+                    self.unique_error_message
+                ]}
+            )
+
+    def create(self, validated_data):
+        validated_data.update(self.get_owner_data())
+        return self.save_unique(super().create, validated_data)
+
+    def update(self, instance, validated_data):
+        return self.save_unique(super().update, instance, validated_data)
+
+
+class FavoriteSerializer(UniqueRelationSerializer):
+    unique_error_message = 'Рецепт уже в избранном'
 
     class Meta:
         model = Favorite
         fields = ('user', 'recipe')
-
-    def validate(self, data):
-        user = self.context.get('request').user
-        recipe = self.context.get('recipe_id')
-        if Favorite.objects.filter(user=user,
-                                   recipe=recipe).exists():
-            raise ValidationError('Рецепт уже в избранном')
-        return data
+        read_only_fields = ('user',)
 
     def to_representation(self, instance):
         return RecipeInFavoriteSerializer(instance.recipe).data
 
 
-class CartSerializer(ModelSerializer):
+class CartSerializer(UniqueRelationSerializer):
+    unique_error_message = 'Рецепт уже добавлен в корзину'
 
     class Meta:
         model = Cart
         fields = ('user', 'recipe')
-
-    def validate(self, data):
-        user = self.context.get('request').user
-        recipe = self.context.get('recipe_id')
-        if Cart.objects.filter(user=user,
-                               recipe=recipe).exists():
-            raise ValidationError('Рецепт уже добавлен в корзину')
-        return data
+        read_only_fields = ('user',)
 
     def to_representation(self, instance):
         request = self.context.get('request')
@@ -228,6 +338,15 @@ class CartSerializer(ModelSerializer):
         return RecipeInFavoriteSerializer(instance.recipe, context=context).data
 
 
+class BulkIdsSerializer(Serializer):
+    """Список id для пакетных операций с избранным, корзиной и подписками."""
+    ids = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+
 class RecipeInSubscriptionsSerializer(ModelSerializer):
 
     class Meta:
@@ -247,13 +366,25 @@ class SubscriptionSerializer(ModelSerializer):
         read_only_fields = ('email', 'id', 'username', 'first_name',
                             'last_name',)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def get_recipes(self, instance):
         request = self.context.get('request')
         recipes_limit = request.query_params.get('recipes_limit')
-        recipes = Recipe.objects.filter(author=instance)
+        if 'recipes' in getattr(instance, '_prefetched_objects_cache', {}):
+            recipes = instance.recipes.all()
+        else:
+            recipes = Recipe.objects.filter(author=instance)
         if recipes_limit:
             recipes_limit = int(recipes_limit)
             recipes = recipes[:recipes_limit]
+        if 'recipes' not in self.context.get('expand', ('recipes',)):
+            return [recipe.id for recipe in recipes]
         context = {'request': request}
         return RecipeInSubscriptionsSerializer(
             recipes,
@@ -262,31 +393,71 @@ class SubscriptionSerializer(ModelSerializer):
         ).data
 
     def get_recipes_count(self, instance):
+        if hasattr(instance, 'recipes_count'):
+            return instance.recipes_count
         return Recipe.objects.filter(author=instance).count()
 
     def get_is_subscribed(self, instance):
         return True
 
 
-class SubscribeCreateSerializer(ModelSerializer):
-    user = PrimaryKeyRelatedField(queryset=User.objects.all())
+class SubscribeCreateSerializer(UniqueRelationSerializer):
     author = PrimaryKeyRelatedField(queryset=User.objects.all())
+    unique_error_message = 'Вы уже подписаны на этого пользователя'
 
     class Meta:
         model = Subscribe
         fields = ('user', 'author')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Subscribe.objects.all(),
-                fields=('user', 'author'),
-                message='Вы уже подписаны на этого пользователя',
-            )
-        ]
+        read_only_fields = ('user',)
 
     def validate(self, value):
         user = self.context.get('request').user
-        if user == value:
+        if user == value['author']:
             raise ValidationError(
                 'Вы не можете подписаться на самого себя!'
             )
         return value
+
+
+class MealPlanEntrySerializer(UniqueRelationSerializer):
+    unique_error_message = 'Рецепт уже запланирован на этот день'
+
+    class Meta:
+        model = MealPlanEntry
+        fields = ('id', 'date', 'recipe', 'servings')
+
+    def get_owner_data(self):
+        return {'plan': self.context.get('plan')}
+
+
+class MealPlanSerializer(ModelSerializer):
+    entries = MealPlanEntrySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = MealPlan
+        fields = ('id', 'name', 'entries')
+
+
+class DateRangeSerializer(Serializer):
+    """Период плана питания для списка покупок."""
+    date_from = DateField(required=False)
+    date_to = DateField(required=False)
+
+    def validate(self, data):
+        date_from = data.get('date_from')
+        date_to = data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError(
+                'Дата начала периода позже даты окончания'
+            )
+        return data
+
+
+class RecommendationsSerializer(Serializer):
+    limit = IntegerField(
+        min_value=1, max_value=SIMILARITY_TOP_K, default=10
+    )
+
+
+class ChangesSerializer(Serializer):
+    since = IntegerField(min_value=0, required=False)
@@ -0,0 +1,132 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.throttling import BaseThrottle
+
+
+def take_tokens(state, now, cost, capacity, rate):
+    """
+    Шаг ведра токенов. Возвращает новое состояние (токены, время) и
+    сколько секунд ждать, если токенов на запрос не хватило.
+    """
+    tokens, updated_at = state or (capacity, now)
+    tokens = min(capacity, tokens + (now - updated_at) * rate)
+    if tokens >= cost:
+        return (tokens - cost, now), 0
+    return (tokens, now), (cost - tokens) / rate
+
+
+class LocalBuckets:
+    """ Вёдра токенов в памяти процесса, не больше max_size ключей """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, cost, capacity, rate):
+        now = time.time()
+        with self._lock:
+            state, wait = take_tokens(
+                self._buckets.get(key), now, cost, capacity, rate
+            )
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+        return state[0], wait
+
+
+class SharedBuckets:
+    """
+    Вёдра токенов в общем бэкенде кэша Django. Чтение и запись не атомарны,
+    при гонке параллельных запросов одного клиента он может получить
+    несколько лишних запросов — для ограничения нагрузки это допустимо.
+    """
+
+    prefix = 'throttle:'
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def take(self, key, cost, capacity, rate):
+        cache = caches[self.alias]
+        state, wait = take_tokens(
+            cache.get(self.prefix + key), time.time(), cost, capacity, rate
+        )
+        # Через capacity / rate секунд ведро всё равно полное.
+        cache.set(self.prefix + key, state, math.ceil(capacity / rate) + 1)
+        return state[0], wait
+
+
+_buckets = None
+
+
+def get_buckets():
+    global _buckets
+    if _buckets is None:
+        options = settings.THROTTLING
+        if options['BACKEND'] == 'shared':
+            _buckets = SharedBuckets(options['CACHE_ALIAS'])
+        else:
+            _buckets = LocalBuckets(options['MAX_SIZE'])
+    return _buckets
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Ограничение частоты запросов ведром токенов: для авторизованных — на
+    пользователя, для анонимов — на IP. Запрос стоит столько токенов,
+    сколько указано в throttle_costs представления для его метода (по
+    умолчанию 1), так что дорогие эндпоинты расходуют лимит быстрее.
+    """
+
+    def get_cost(self, request, view, capacity):
+        cost = getattr(view, 'throttle_costs', {}).get(request.method, 1)
+        return min(cost, capacity)
+
+    def allow_request(self, request, view):
+        options = settings.THROTTLING
+        if not options['ENABLED']:
+            return True
+        if request.user and request.user.is_authenticated:
+            key = f'user:{request.user.pk}'
+            limits = options['USER']
+        else:
+            key = f'ip:{self.get_ident(request)}'
+            limits = options['ANON']
+        capacity, rate = limits['CAPACITY'], limits['RATE']
+        remaining, self.wait_seconds = get_buckets().take(
+            key, self.get_cost(request, view, capacity), capacity, rate
+        )
+        # Заголовки добавляет RateLimitHeadersMiddleware.
+        request._request.rate_limit = (
+            capacity,
+            math.floor(remaining),
+            math.ceil((capacity - remaining) / rate),
+        )
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class RateLimitHeadersMiddleware(MiddlewareMixin):
+    """ Заголовки RateLimit-* для запросов, прошедших через троттлинг """
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit is not None:
+            limit, remaining, reset = rate_limit
+            response['RateLimit-Limit'] = str(limit)
+            response['RateLimit-Remaining'] = str(remaining)
+            response['RateLimit-Reset'] = str(reset)
+        return response
@@ -1,9 +1,16 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CartAPIView, DownloadCartVAPIView, FavoriteAPIView,
-                    IngredientViewSet, RecipeViewSet, SubscribeCreateAPIView,
-                    SubscribeListViewSet, TagViewSet)
+from .async_views import async_view
+from .views import (CartAPIView, CartBulkAPIView, ChangesAPIView,
+                    ChangesStreamAPIView, DBPoolStatsAPIView,
+                    DownloadCartVAPIView, FavoriteAPIView, FavoriteBulkAPIView,
+                    IngredientViewSet, MealPlanEntryViewSet,
+                    MealPlanShoppingListAPIView, MealPlanViewSet,
+                    ProfilingAPIView, RecipeViewSet, RecommendedRecipesAPIView,
+                    SimilarRecipesAPIView, SubscribeBulkAPIView,
+                    SubscribeCreateAPIView, SubscribeListViewSet, TagViewSet)
 
 app_name = 'api'
 router = DefaultRouter()
@@ -11,6 +18,12 @@ router = DefaultRouter()
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('tags', TagViewSet, basename='tags')
 router.register('recipes', RecipeViewSet, basename='recipes')
+router.register('meal_plans', MealPlanViewSet, basename='meal_plans')
+router.register(
+    r'meal_plans/(?P<plan_id>\d+)/entries',
+    MealPlanEntryViewSet,
+    basename='meal_plan_entries'
+)
 
 
 urlpatterns = [
@@ -24,6 +37,31 @@ urlpatterns = [
         FavoriteAPIView.as_view(),
         name='favorite'
     ),
+    path(
+        'recipes/<int:id>/similar/',
+        SimilarRecipesAPIView.as_view(),
+        name='similar_recipes'
+    ),
+    path(
+        'recipes/recommended/',
+        RecommendedRecipesAPIView.as_view(),
+        name='recommended_recipes'
+    ),
+    path(
+        'recipes/shopping_cart/',
+        CartBulkAPIView.as_view(),
+        name='cart_bulk'
+    ),
+    path(
+        'recipes/favorite/',
+        FavoriteBulkAPIView.as_view(),
+        name='favorite_bulk'
+    ),
+    path(
+        'users/subscribe/',
+        SubscribeBulkAPIView.as_view(),
+        name='subscribe_bulk'
+    ),
     path(
         'users/<int:id>/subscribe/',
         SubscribeCreateAPIView.as_view(),
@@ -39,7 +77,73 @@ urlpatterns = [
         DownloadCartVAPIView.as_view(),
         name='download_cart'
     ),
+    path(
+        'meal_plans/<int:id>/shopping_list/',
+        MealPlanShoppingListAPIView.as_view(),
+        name='meal_plan_shopping_list'
+    ),
+    path(
+        'changes/',
+        ChangesAPIView.as_view(),
+        name='changes'
+    ),
+    path(
+        'changes/stream/',
+        ChangesStreamAPIView.as_view(),
+        name='changes_stream'
+    ),
+    path(
+        'db_pool_stats/',
+        DBPoolStatsAPIView.as_view(),
+        name='db_pool_stats'
+    ),
+    path(
+        'profiling/',
+        ProfilingAPIView.as_view(),
+        name='profiling'
+    ),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASYNC_API_VIEWS:
+    list_actions = {'get': 'list', 'post': 'create'}
+    detail_actions = {
+        'get': 'retrieve',
+        'put': 'update',
+        'patch': 'partial_update',
+        'delete': 'destroy',
+    }
+    urlpatterns = [
+        path(
+            'recipes/',
+            async_view(RecipeViewSet, list_actions),
+            name='recipes-list'
+        ),
+        path(
+            'recipes/<int:pk>/',
+            async_view(RecipeViewSet, detail_actions),
+            name='recipes-detail'
+        ),
+        path(
+            'ingredients/',
+            async_view(IngredientViewSet, list_actions),
+            name='ingredients-list'
+        ),
+        path(
+            'ingredients/<int:pk>/',
+            async_view(IngredientViewSet, detail_actions),
+            name='ingredients-detail'
+        ),
+        path(
+            'tags/',
+            async_view(TagViewSet, list_actions),
+            name='tags-list'
+        ),
+        path(
+            'tags/<int:pk>/',
+            async_view(TagViewSet, detail_actions),
+            name='tags-detail'
+        ),
+    ] + urlpatterns
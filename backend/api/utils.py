@@ -1,23 +1,131 @@
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
 from recipes.models import Recipe
 
+from .changes import record_relations
+from .serializers import BulkIdsSerializer
+
 
 def custom_post(request, id, serializer):
-    user_id = request.user.id
-    data = {'user': user_id, 'recipe': id}
-    serializer = serializer(data=data, context={'request': request})
+    serializer = serializer(data={'recipe': id}, context={'request': request})
     serializer.is_valid(raise_exception=True)
     serializer.save()
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-def custom_delete(request, id, model):
+
+def custom_delete(request, id, model, field='recipe', target_model=Recipe):
+    """
+    Удаление без предварительной проверки: число удалённых строк определяет
+    ответ, существование объекта проверяется только если удалять было
+    нечего. Удаление избранного и корзины пишет журнал сигналом post_delete.
+    """
+    deleted, _ = model.objects.filter(
+        user=request.user, **{f'{field}_id': id}
+    ).delete()
+    if deleted:
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    get_object_or_404(target_model, id=id)
+    return Response(status=status.HTTP_400_BAD_REQUEST)
+
+
+def get_bulk_ids(request):
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return list(dict.fromkeys(serializer.validated_data['ids']))
+
+
+def bulk_results(ids, statuses):
+    return Response(
+        {'results': [{'id': id, 'status': statuses[id]} for id in ids]},
+        status=status.HTTP_200_OK
+    )
+
+
+def custom_bulk_post(request, model, target_model, field='recipe'):
+    """ Пакетное добавление связей пользователя с объектами по списку id """
     user = request.user
-    recipe = get_object_or_404(Recipe, id=id)
-    deleting_obj = model.objects.filter(user=user, recipe=recipe)
-    if not deleting_obj.exists():
-        return Response(status=status.HTTP_400_BAD_REQUEST)
-    deleting_obj.delete()
-    return Response(status=status.HTTP_204_NO_CONTENT)
+    ids = get_bulk_ids(request)
+    lookup = f'{field}_id'
+    with transaction.atomic():
+        found = set(
+            target_model.objects.filter(id__in=ids)
+            .values_list('id', flat=True)
+        )
+        existing = set(
+            model.objects.filter(user=user, **{f'{lookup}__in': ids})
+            .values_list(lookup, flat=True)
+        )
+        statuses = {}
+        new_objs = []
+        for id in ids:
+            if id not in found:
+                statuses[id] = 'not_found'
+            elif field == 'author' and id == user.id:
+                statuses[id] = 'invalid'
+            elif id in existing:
+                statuses[id] = 'exists'
+            else:
+                statuses[id] = 'created'
+                new_objs.append(model(user=user, **{lookup: id}))
+        model.objects.bulk_create(new_objs, ignore_conflicts=True)
+        record_relations(
+            model, user, [getattr(obj, lookup) for obj in new_objs]
+        )
+    return bulk_results(ids, statuses)
+
+
+def custom_bulk_delete(request, model, field='recipe'):
+    """ Пакетное удаление связей пользователя с объектами по списку id """
+    user = request.user
+    ids = get_bulk_ids(request)
+    lookup = f'{field}_id'
+    with transaction.atomic():
+        deleting_objs = model.objects.filter(
+            user=user, **{f'{lookup}__in': ids}
+        )
+        existing = set(
+            deleting_objs.select_for_update().values_list(lookup, flat=True)
+        )
+        deleting_objs.delete()
+    statuses = {
+        id: 'deleted' if id in existing else 'not_found' for id in ids
+    }
+    return bulk_results(ids, statuses)
+
+
+def split_query_param(request, name):
+    value = request.query_params.get(name, '')
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def get_sparse_fields(request, allowed, nested=()):
+    """
+    Разбор параметров ?fields= и ?expand=.
+
+    Без fields возвращаются все поля с развёрнутыми вложенными объектами.
+    Поле id возвращается всегда, развернуть можно только поля из fields.
+    """
+    fields = split_query_param(request, 'fields')
+    if not fields:
+        return tuple(allowed), tuple(nested)
+    expand = split_query_param(request, 'expand')
+    unknown = set(fields) - set(allowed) | set(expand) - set(nested)
+    if unknown:
+        raise ValidationError(
+            {'fields': f'Неизвестные поля: {", ".join(sorted(unknown))}'}
+        )
+    not_requested = set(expand) - set(fields)
+    if not_requested:
+        raise ValidationError(
+            {'expand': 'Поля не перечислены в fields: '
+                       f'{", ".join(sorted(not_requested))}'}
+        )
+    fields = tuple(
+        name for name in allowed if name in fields or name == 'id'
+    )
+    expand = tuple(name for name in nested if name in expand)
+    return fields, expand
@@ -1,36 +1,70 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import (BooleanField, Count, Exists, OuterRef, Prefetch,
+                              Sum, Value)
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
+                                        IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
+from foodgram.db_backends.postgresql.pool import get_pools_stats
 from recipes.models import (Cart, Favorite, Ingredient, IngredientInRecipe,
-                            Recipe, Tag)
+                            MealPlan, Recipe, Tag, TagInRecipe)
+from recipes.recommendations import (get_recommended_recipes,
+                                     get_similar_recipes)
+from recipes.units import build_shopping_list
 from users.models import Subscribe, User
+
+from .changes import get_changes, get_last_cursor, is_expired
+from .fast_serializers import (RECIPE_FIELDS, RECIPE_NESTED_FIELDS,
+                               FastRecipeSerializer)
 from .filters import IngredientFilter, RecipeFilter
+from .meal_plans import get_plan_shopping_list
+from .mixins import CachedListMixin
+from .nutrition import get_cart_totals
+from .parsers import FastJSONParser, JSONMultiPartParser
 from .permissions import IsAuthorOrReadOnly, ReadOnly
-from .serializers import (CartSerializer,  FavoriteSerializer,
-                          IngredientSerializer, RecipeCreateSerializer,
-                          RecipeSerializer, SubscribeCreateSerializer,
-                          SubscriptionSerializer, TagSerializer,)
-from .utils import custom_delete, custom_post
+from .profiling import get_collapsed_stacks, get_sampler, make_token
+from .renderers import EventStreamRenderer, FastJSONRenderer
+from .serializers import (CartSerializer, ChangesSerializer,
+                          DateRangeSerializer, FavoriteSerializer,
+                          IngredientSerializer, MealPlanEntrySerializer,
+                          MealPlanSerializer, RecipeCreateSerializer,
+                          RecipeInFavoriteSerializer, RecipeSerializer,
+                          RecommendationsSerializer, SubscribeCreateSerializer,
+                          SubscriptionSerializer, TagSerializer)
+from .utils import (custom_bulk_delete, custom_bulk_post, custom_delete,
+                    custom_post, get_sparse_fields)
 
+AUTHOR_COLUMNS = ('email', 'username', 'first_name', 'last_name')
+USER_COLUMNS = ('id',) + AUTHOR_COLUMNS
+SUBSCRIPTION_FIELDS = (
+    'email', 'id', 'username', 'first_name', 'last_name', 'recipes',
+    'is_subscribed', 'recipes_count',
+)
+SUBSCRIPTION_NESTED_FIELDS = ('recipes',)
 
-class IngredientViewSet(ModelViewSet):
+
+class IngredientViewSet(CachedListMixin, ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    throttle_costs = {'GET': 2}
     pagination_class = None
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
 
 
-class TagViewSet(ModelViewSet):
+class TagViewSet(CachedListMixin, ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
@@ -40,13 +74,101 @@ class TagViewSet(ModelViewSet):
 class RecipeViewSet(ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
+    throttle_costs = {'POST': 10, 'PUT': 10, 'PATCH': 10}
+    # Запись рецепта проверяет каждый ингредиент и тег отдельным запросом.
+    query_budgets = {
+        'GET': 6, 'POST': 40, 'PUT': 40, 'PATCH': 40, 'DELETE': 20
+    }
+    # Изображение можно прислать base64-строкой в JSON или файлом
+    # в multipart-запросе с JSON в поле data.
+    parser_classes = (FastJSONParser, JSONMultiPartParser)
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
+    @cached_property
+    def sparse_fields(self):
+        if self.action not in ('list', 'retrieve'):
+            return RECIPE_FIELDS, RECIPE_NESTED_FIELDS
+        return get_sparse_fields(
+            self.request, RECIPE_FIELDS, RECIPE_NESTED_FIELDS
+        )
+
+    def get_columns(self, fields, expand):
+        columns = ['id'] + [
+            name for name in ('name', 'text', 'image', 'cooking_time')
+            if name in fields
+        ]
+        if 'nutrition' in fields:
+            columns.append('updated_at')
+        if 'author' in fields:
+            columns.append('author')
+            if 'author' in expand:
+                columns += ['author__' + name for name in AUTHOR_COLUMNS]
+        return columns
+
+    def get_queryset(self):
+        """
+        Загружает только столбцы и связи, нужные для запрошенных полей.
+        """
+        user = self.request.user
+        fields, expand = self.sparse_fields
+        queryset = Recipe.objects.all()
+        if fields != RECIPE_FIELDS:
+            queryset = queryset.only(*self.get_columns(fields, expand))
+        if 'author' in expand:
+            queryset = queryset.select_related('author')
+        if 'tags' in expand:
+            queryset = queryset.prefetch_related('tags')
+        elif 'tags' in fields:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'recipe_tags',
+                    queryset=TagInRecipe.objects.only('recipe', 'tag')
+                )
+            )
+        if 'ingredients' in fields:
+            ingredients = IngredientInRecipe.objects.all()
+            if 'ingredients' in expand:
+                ingredients = ingredients.select_related('ingredient')
+            else:
+                ingredients = ingredients.only(
+                    'recipe', 'ingredient', 'amount'
+                )
+            queryset = queryset.prefetch_related(
+                Prefetch('recipe', queryset=ingredients)
+            )
+        flags = {
+            'is_favorited': Favorite.objects.filter(
+                user=user.id, recipe=OuterRef('pk')
+            ),
+            'is_in_shopping_cart': Cart.objects.filter(
+                user=user.id, recipe=OuterRef('pk')
+            ),
+            'is_subscribed': Subscribe.objects.filter(
+                user=user.id, author=OuterRef('author')
+            ),
+        }
+        requested = set(fields)
+        if 'author' in expand:
+            requested.add('is_subscribed')
+        return queryset.annotate(**{
+            name: (
+                Value(False, output_field=BooleanField())
+                if user.is_anonymous else Exists(subquery)
+            )
+            for name, subquery in flags.items() if name in requested
+        })
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'], context['expand'] = self.sparse_fields
+        return context
 
     def get_serializer_class(self):
         if self.request.method in ['POST', 'PATCH']:
             return RecipeCreateSerializer
+        if self.action == 'list' or self.sparse_fields[0] != RECIPE_FIELDS:
+            return FastRecipeSerializer
         return RecipeSerializer
 
 
@@ -59,6 +181,16 @@ class FavoriteAPIView(APIView):
         return custom_delete(request, id, Favorite)
 
 
+class FavoriteBulkAPIView(APIView):
+    throttle_costs = {'POST': 5, 'DELETE': 5}
+
+    def post(self, request):
+        return custom_bulk_post(request, Favorite, Recipe)
+
+    def delete(self, request):
+        return custom_bulk_delete(request, Favorite)
+
+
 class CartAPIView(APIView):
     pagination_class = PageNumberPagination
 
@@ -72,39 +204,64 @@ class CartAPIView(APIView):
         return custom_delete(request, id, Cart)
 
 
+class CartBulkAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+    throttle_costs = {'GET': 3, 'POST': 5, 'DELETE': 5}
+
+    def get(self, request):
+        recipes = Recipe.objects.filter(
+            recipe_in_shopping_cart__user=request.user
+        )
+        return Response({
+            'recipes': RecipeInFavoriteSerializer(
+                recipes, many=True, context={'request': request}
+            ).data,
+            'totals': get_cart_totals(request.user),
+        })
+
+    def post(self, request):
+        return custom_bulk_post(request, Cart, Recipe)
+
+    def delete(self, request):
+        return custom_bulk_delete(request, Cart)
+
+
 class DownloadCartVAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+    throttle_costs = {'GET': 10}
+    totals_rows = (
+        ('calories', 'Калорийность', 'ккал'),
+        ('proteins', 'Белки', 'г'),
+        ('fats', 'Жиры', 'г'),
+        ('carbohydrates', 'Углеводы', 'г'),
+        ('price', 'Стоимость', 'руб.'),
+    )
+
+    def get_totals_rows(self, user):
+        totals = get_cart_totals(user)
+        rows = [
+            f'{title}: {totals[name]} {unit}\n'
+            for name, title, unit in self.totals_rows
+            if totals[name] is not None
+        ]
+        return ['\nИтого:\n'] + rows if rows else []
+
     def get(self, request):
         user = request.user
-        if not user.shopping_cart.exists():
-            return Response(
-                'Корзина пуста', status=status.HTTP_400_BAD_REQUEST
-            )
-        ingredient_name = "recipe__ingredients__name"
-        ingredient_measurement_unit = "recipe__ingredients__measurement_unit"
-        ingredient_amount = "recipe__ingredients__ingredient__amount"
-        ingredients = (
-            Cart.objects.annotate(
-                result=Sum(ingredient_amount),
+        rows = (
+            IngredientInRecipe.objects.filter(
+                recipe__recipe_in_shopping_cart__user=user
             )
-            .values(
-                ingredient_name,
-                ingredient_measurement_unit,
-                "result",
-            ).filter(user=request.user)
+            .values_list('ingredient__name', 'ingredient__measurement_unit')
+            .annotate(amount=Sum('amount'))
+            .order_by()
         )
-        cart = {
-            x["recipe__ingredients__name"]: x for x in ingredients
-        }.values()
-        text = []
-        for item in cart:
-            new_row = (
-                f'{item[ingredient_name]} - {item["result"]}'
-                f'{item[ingredient_measurement_unit]}\n'
+        if not rows:
+            return Response(
+                'Корзина пуста', status=status.HTTP_400_BAD_REQUEST
             )
-            if new_row not in text:
-                text += new_row
-            else:
-                continue
+        text = [f'{row}\n' for row in build_shopping_list(rows)]
+        text += self.get_totals_rows(user)
         response = HttpResponse(text, content_type='text/plain')
         filename = 'Ingredients_in_cart.txt'
         response['Content-Disposition'] = f'attachment; filename={filename}'
@@ -114,18 +271,46 @@ class DownloadCartVAPIView(APIView):
 class SubscribeListViewSet(ModelViewSet):
     queryset = Subscribe.objects.all()
     serializer_class = SubscriptionSerializer
+    query_budgets = {'GET': 4}
+
+    @cached_property
+    def sparse_fields(self):
+        return get_sparse_fields(
+            self.request, SUBSCRIPTION_FIELDS, SUBSCRIPTION_NESTED_FIELDS
+        )
 
     def get_queryset(self):
         user = self.request.user
-        return User.objects.filter(following_author__user=user)
+        fields, expand = self.sparse_fields
+        queryset = User.objects.filter(following_author__user=user).only(
+            *(name for name in USER_COLUMNS if name in fields)
+        )
+        if 'recipes_count' in fields:
+            queryset = queryset.annotate(
+                recipes_count=Count('recipes')
+            ).order_by(*User._meta.ordering)
+        if 'recipes' in fields:
+            recipes = Recipe.objects.only('author')
+            if 'recipes' in expand:
+                recipes = Recipe.objects.only(
+                    'id', 'name', 'image', 'cooking_time', 'author'
+                )
+            queryset = queryset.prefetch_related(
+                Prefetch('recipes', queryset=recipes)
+            )
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'], context['expand'] = self.sparse_fields
+        return context
 
 
 class SubscribeCreateAPIView(APIView):
 
     def post(self, request, id):
-        user = request.user
         serializer = SubscribeCreateSerializer(
-            data={"user": user.id, "author": id},
+            data={"author": id},
             context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
@@ -133,12 +318,229 @@ class SubscribeCreateAPIView(APIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, id):
-        user = request.user
-        author = get_object_or_404(User, id=id)
-        deleting_obj = Subscribe.objects.filter(
-            user=user, author=author
+        return custom_delete(
+            request, id, Subscribe, field='author', target_model=User
+        )
+
+
+class SubscribeBulkAPIView(APIView):
+    throttle_costs = {'POST': 5, 'DELETE': 5}
+
+    def post(self, request):
+        return custom_bulk_post(request, Subscribe, User, field='author')
+
+    def delete(self, request):
+        return custom_bulk_delete(request, Subscribe, field='author')
+
+
+class SimilarRecipesAPIView(APIView):
+
+    def get(self, request, id):
+        serializer = RecommendationsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        recipes = get_similar_recipes(id, **serializer.validated_data)
+        return Response(RecipeInFavoriteSerializer(
+            recipes, many=True, context={'request': request}
+        ).data)
+
+
+class RecommendedRecipesAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        serializer = RecommendationsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        recipes = get_recommended_recipes(
+            request.user, **serializer.validated_data
+        )
+        return Response(RecipeInFavoriteSerializer(
+            recipes, many=True, context={'request': request}
+        ).data)
+
+
+class MealPlanViewSet(ModelViewSet):
+    serializer_class = MealPlanSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return MealPlan.objects.filter(
+            user=self.request.user
+        ).prefetch_related('entries')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class MealPlanEntryViewSet(ModelViewSet):
+    serializer_class = MealPlanEntrySerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = None
+
+    @cached_property
+    def plan(self):
+        return get_object_or_404(
+            MealPlan, id=self.kwargs['plan_id'], user=self.request.user
+        )
+
+    def get_queryset(self):
+        return self.plan.entries.all()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['plan'] = self.plan
+        return context
+
+
+class MealPlanShoppingListAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+    throttle_costs = {'GET': 10}
+
+    def get(self, request, id):
+        plan = get_object_or_404(MealPlan, id=id, user=request.user)
+        serializer = DateRangeSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        rows = get_plan_shopping_list(plan, **serializer.validated_data)
+        if not rows:
+            return Response(
+                'В плане питания нет рецептов',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        text = [f'{row}\n' for row in rows]
+        response = HttpResponse(text, content_type='text/plain')
+        filename = f'Meal_plan_{plan.id}.txt'
+        response['Content-Disposition'] = f'attachment; filename={filename}'
+        return response
+
+
+class ChangesAPIView(APIView):
+    """
+    Изменения рецептов, избранного и корзины после курсора ?since=.
+    Без курсора возвращает текущий курсор, с которого начинать синхронизацию.
+    """
+
+    def get_cursor(self, request):
+        data = request.query_params.dict()
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID')
+        if last_event_id:
+            data['since'] = last_event_id
+        serializer = ChangesSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data.get('since')
+
+    def expired_response(self):
+        return Response(
+            {'detail': 'Курсор устарел, загрузите данные заново'},
+            status=status.HTTP_410_GONE
         )
-        if deleting_obj.exists():
-            deleting_obj.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response(status=status.HTTP_400_BAD_REQUEST)
+
+    def get(self, request):
+        cursor = self.get_cursor(request)
+        if cursor is None:
+            return Response({
+                'cursor': str(get_last_cursor()),
+                'has_more': False,
+                'changes': [],
+            })
+        if is_expired(cursor):
+            return self.expired_response()
+        return Response(get_changes(
+            request.user, cursor, settings.CHANGES['PAGE_SIZE']
+        ))
+
+
+class ChangesStreamAPIView(ChangesAPIView):
+    """
+    Те же изменения потоком Server-Sent Events. Поток занимает воркер и
+    закрывается через CHANGES['STREAM_TIMEOUT'] секунд, клиент
+    переподключается с заголовком Last-Event-ID.
+
+    Под ASGI Django 3.2 перебирает потоковый ответ прямо в цикле событий,
+    где ожидание остановило бы все запросы, поэтому там за одно
+    подключение отдаётся одна страница и клиент переподключается через
+    CHANGES['STREAM_POLL_INTERVAL'] секунд.
+    """
+    renderer_classes = (EventStreamRenderer,)
+    throttle_costs = {'GET': 10}
+
+    def render_event(self, page):
+        if not page['changes']:
+            # Событие без данных только запоминает курсор у клиента.
+            return f'id: {page["cursor"]}\n\n'.encode()
+        return (
+            f'id: {page["cursor"]}\nevent: changes\ndata: '.encode()
+            + FastJSONRenderer().render(page) + b'\n\n'
+        )
+
+    def stream(self, user, cursor):
+        options = settings.CHANGES
+        deadline = time.monotonic() + options['STREAM_TIMEOUT']
+        yield b'retry: 1000\n\n'
+        while time.monotonic() < deadline:
+            page = get_changes(user, cursor, options['PAGE_SIZE'])
+            if page['changes']:
+                cursor = int(page['cursor'])
+                yield self.render_event(page)
+            if not page['has_more']:
+                time.sleep(options['STREAM_POLL_INTERVAL'])
+                yield b': ping\n\n'
+
+    def single_page(self, user, cursor):
+        options = settings.CHANGES
+        page = get_changes(user, cursor, options['PAGE_SIZE'])
+        retry = 0 if page['has_more'] else options['STREAM_POLL_INTERVAL']
+        return (
+            f'retry: {int(retry * 1000)}\n\n'.encode()
+            + self.render_event(page)
+        )
+
+    def get(self, request):
+        cursor = self.get_cursor(request)
+        if cursor is None:
+            cursor = get_last_cursor()
+        elif is_expired(cursor):
+            return self.expired_response()
+        if isinstance(request._request, ASGIRequest):
+            response = HttpResponse(
+                self.single_page(request.user, cursor),
+                content_type='text/event-stream'
+            )
+        else:
+            response = StreamingHttpResponse(
+                self.stream(request.user, cursor),
+                content_type='text/event-stream'
+            )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class DBPoolStatsAPIView(APIView):
+    """ Метрики пула соединений с базой данных текущего процесса """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_pools_stats())
+
+
+class ProfilingAPIView(APIView):
+    """
+    Стеки профилируемых запросов в формате для flamegraph.pl, ?view=
+    оставляет одно представление. POST выдаёт значение заголовка
+    X-Profile для профилирования своих запросов, DELETE очищает стеки.
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        response = HttpResponse(
+            get_collapsed_stacks(request.query_params.get('view')),
+            content_type='text/plain'
+        )
+        response['Content-Disposition'] = 'attachment; filename=stacks.txt'
+        return response
+
+    def post(self, request):
+        return Response({'header': 'X-Profile', 'token': make_token()})
+
+    def delete(self, request):
+        get_sampler().clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
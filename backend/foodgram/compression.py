@@ -0,0 +1,138 @@
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'text/',
+)
+# События SSE должны уходить клиенту сразу, без буфера компрессора.
+INCOMPRESSIBLE_TYPES = ('text/event-stream',)
+
+
+def get_encodings():
+    """ Поддерживаемые кодировки в порядке предпочтения сервера """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding):
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        accepted[name.strip().lower()] = quality
+    for encoding in get_encodings():
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(content, encoding):
+    options = settings.COMPRESSION
+    if encoding == 'br':
+        return brotli.compress(content, quality=options['BROTLI_QUALITY'])
+    compressor = zlib.compressobj(options['GZIP_LEVEL'], zlib.DEFLATED, 31)
+    return compressor.compress(content) + compressor.flush()
+
+
+def compress_stream(chunks, encoding):
+    options = settings.COMPRESSION
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=options['BROTLI_QUALITY'])
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(options['GZIP_LEVEL'], zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def precompress(content):
+    """
+    Сжатые варианты содержимого для хранения в кэше вместе с ним.
+    Небольшое содержимое не сжимается.
+    """
+    if len(content) < settings.COMPRESSION['MIN_SIZE']:
+        return {}
+    return {
+        encoding: compress(content, encoding) for encoding in get_encodings()
+    }
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '')
+    return content_type.startswith(COMPRESSIBLE_TYPES) and (
+        not content_type.startswith(INCOMPRESSIBLE_TYPES)
+    )
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжатие ответов brotli или gzip в зависимости от Accept-Encoding.
+
+    Ответы меньше COMPRESSION['MIN_SIZE'] байт не сжимаются, потоковые
+    ответы сжимаются по частям. Если у ответа есть атрибут precompressed
+    со словарём заранее сжатых вариантов, используется готовый вариант.
+    """
+
+    async def __acall__(self, request):
+        # Сжатие не обращается к базе, переходить в синхронный поток
+        # ради него не нужно.
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not is_compressible(
+            response
+        ):
+            return response
+        if not response.streaming and (
+            len(response.content) < settings.COMPRESSION['MIN_SIZE']
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            precompressed = getattr(response, 'precompressed', {})
+            content = precompressed.get(encoding)
+            if content is None:
+                content = compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
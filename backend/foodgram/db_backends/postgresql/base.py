@@ -0,0 +1,54 @@
+from django.db.backends.postgresql import base
+
+from .pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Бэкенд PostgreSQL с необязательным пулом соединений (ключ POOL в
+    настройках базы) и проверкой постоянных соединений перед запросом
+    (ключ CONN_HEALTH_CHECKS).
+    """
+
+    @property
+    def pool(self):
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return None
+        return get_pool(self.alias, options)
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection = pool.getconn(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+        )
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        pool.putconn(self.connection)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        if self.connection is not None:
+            self.health_check_pending = bool(
+                self.settings_dict.get('CONN_HEALTH_CHECKS')
+            )
+
+    def ensure_connection(self):
+        # Постоянное соединение проверяется один раз, перед первым
+        # запросом к базе в рамках нового HTTP-запроса.
+        if getattr(self, 'health_check_pending', False):
+            self.health_check_pending = False
+            if not self.in_atomic_block and not self.is_usable():
+                self.close()
+        super().ensure_connection()
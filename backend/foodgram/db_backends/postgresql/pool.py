@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import extensions
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений psycopg2 с ожиданием свободного
+    соединения, проверкой работоспособности и пересозданием старых соединений.
+    """
+
+    def __init__(self, max_size=10, timeout=10, recycle=1800,
+                 health_check_after=30):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.health_check_after = health_check_after
+        self._idle = deque()
+        self._created_at = {}
+        self._size = 0
+        self._condition = threading.Condition()
+        self.stats = {
+            'created': 0,
+            'closed': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'failed_health_checks': 0,
+        }
+
+    def getconn(self, connect):
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            self.stats['checkouts'] += 1
+        while True:
+            idle = self._reserve(deadline)
+            if idle is None:
+                break
+            # Проверка идёт без блокировки пула: запрос к базе не должен
+            # задерживать выдачу соединений другим потокам.
+            connection, released_at = idle
+            if self._is_usable(connection, released_at):
+                return connection
+            with self._condition:
+                self._discard(connection)
+                self._condition.notify()
+        try:
+            connection = connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.stats['created'] += 1
+            self._created_at[id(connection)] = time.monotonic()
+        return connection
+
+    def _reserve(self, deadline):
+        """
+        Свободное соединение с временем возврата в пул или None, если
+        можно открыть новое: место под него уже учтено в размере пула.
+        """
+        with self._condition:
+            waited = False
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                if not waited:
+                    self.stats['waits'] += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'Нет свободных соединений с базой данных '
+                        f'за {self.timeout} с'
+                    )
+                self._condition.wait(remaining)
+
+    def putconn(self, connection):
+        with self._condition:
+            if connection.closed or self._is_expired(connection):
+                self._discard(connection)
+            else:
+                try:
+                    status = connection.get_transaction_status()
+                    if status != extensions.TRANSACTION_STATUS_IDLE:
+                        connection.rollback()
+                except Exception:
+                    self._discard(connection)
+                else:
+                    self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def close_all(self):
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                self._discard(connection)
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                **self.stats,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+            }
+
+    def _is_expired(self, connection):
+        created_at = self._created_at.get(id(connection), 0)
+        return time.monotonic() - created_at > self.recycle
+
+    def _is_usable(self, connection, released_at):
+        if connection.closed or self._is_expired(connection):
+            return False
+        if time.monotonic() - released_at < self.health_check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            with self._condition:
+                self.stats['failed_health_checks'] += 1
+            return False
+        return True
+
+    def _discard(self, connection):
+        self._size -= 1
+        self.stats['closed'] += 1
+        self._created_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = None
+
+
+def get_pool(alias, options):
+    """Пул для алиаса базы данных, свой в каждом процессе."""
+    global _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools.clear()
+            _pools_pid = os.getpid()
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(**options)
+        return _pools[alias]
+
+
+def get_pools_stats():
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            return {}
+        return {alias: pool.get_stats() for alias, pool in _pools.items()}
@@ -0,0 +1,119 @@
+import asyncio
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.authentication import get_authorization_header
+from rest_framework.permissions import SAFE_METHODS
+
+STICKY_COOKIE = 'replica_sticky'
+STICKY_SALT = 'foodgram.db_routers'
+STICKY_CACHE_PREFIX = 'replica_sticky:'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def get_replicas():
+    return [
+        alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS
+    ]
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Разрешает чтение с реплик для безопасных запросов к API.
+
+    После успешного изменяющего запроса клиент REPLICA_STICKY_SECONDS
+    секунд читает из основной базы, чтобы сразу видеть свои изменения.
+    Клиентов с токеном помечает запись в кэше по токену, остальных —
+    подписанная cookie.
+    """
+
+    def get_token(self, request):
+        auth = get_authorization_header(request).split()
+        if len(auth) == 2 and auth[0].lower() == b'token':
+            return auth[1].decode(errors='replace')
+        return None
+
+    def is_sticky(self, request):
+        token = self.get_token(request)
+        if token is not None and cache.get(STICKY_CACHE_PREFIX + token):
+            return True
+        return request.get_signed_cookie(
+            STICKY_COOKIE, default=None, salt=STICKY_SALT,
+            max_age=settings.REPLICA_STICKY_SECONDS
+        ) is not None
+
+    def use_replica(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and request.path.startswith('/api/')
+            and not self.is_sticky(request)
+        )
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = _use_replica.set(self.use_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        token = _use_replica.set(self.use_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if (
+            request.method in SAFE_METHODS
+            or not 200 <= response.status_code < 300
+            or not get_replicas()
+        ):
+            return response
+        token = self.get_token(request)
+        if token is not None:
+            cache.set(
+                STICKY_CACHE_PREFIX + token, True,
+                settings.REPLICA_STICKY_SECONDS
+            )
+        response.set_signed_cookie(
+            STICKY_COOKIE, '1', salt=STICKY_SALT,
+            max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+            samesite='Lax'
+        )
+        return response
+
+
+class ReplicaRouter:
+    """
+    Чтение с реплик, запись и транзакции — в основной базе.
+
+    Токены всегда читаются из основной базы: только что выданный токен
+    может ещё не дойти до реплики.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if (
+            not replicas
+            or not _use_replica.get()
+            or model._meta.app_label == 'authtoken'
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
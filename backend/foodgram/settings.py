@@ -16,6 +16,7 @@ INSTALLED_APPS = [
     'api',
     'users',
     'recipes',
+    'jobs',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -31,10 +32,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.query_budget.QueryBudgetMiddleware',
+    'api.profiling.ProfilingMiddleware',
+    'foodgram.db_routers.ReplicaRoutingMiddleware',
+    'api.throttling.RateLimitHeadersMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -59,17 +65,46 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+ASYNC_API_VIEWS = os.getenv('ASYNC_API_VIEWS', default='False') == 'True'
+
+DB_POOL = os.getenv('DB_POOL', default='False') == 'True'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'foodgram.db_backends.postgresql',
         'NAME': os.getenv('POSTGRES_DB'),
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        # С пулом соединение возвращается в пул в конце каждого запроса.
+        'CONN_MAX_AGE': 0 if DB_POOL else int(
+            os.getenv('CONN_MAX_AGE', default=60)
+        ),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': {
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+            'recycle': int(os.getenv('DB_POOL_RECYCLE', default=1800)),
+        } if DB_POOL else None,
     }
 }
 
+for number, host in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram.db_routers.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', default=10))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -92,11 +127,122 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
+    ],
+    "DEFAULT_THROTTLE_CLASSES": [
+        "api.throttling.TokenBucketThrottle",
     ],
+    # Адрес клиента берётся из X-Forwarded-For, который дописывает nginx.
+    "NUM_PROXIES": int(os.getenv('NUM_PROXIES', default=1)),
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
+COMPRESSION = {
+    'MIN_SIZE': int(os.getenv('COMPRESSION_MIN_SIZE', default=1024)),
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 4,
+}
+
+# BACKEND: local — кэш в памяти процесса, shared — общий кэш CACHE_ALIAS
+TOKEN_AUTH_CACHE = {
+    'BACKEND': os.getenv('TOKEN_AUTH_CACHE_BACKEND', default='local'),
+    'TTL': int(os.getenv('TOKEN_AUTH_CACHE_TTL', default=30)),
+    'MAX_SIZE': int(os.getenv('TOKEN_AUTH_CACHE_MAX_SIZE', default=10000)),
+    'CACHE_ALIAS': 'default',
+}
+
+# EAGER — выполнять задачи сразу после фиксации транзакции, без воркеров
+JOBS = {
+    'EAGER': os.getenv('JOBS_EAGER', default='False') == 'True',
+    'LOCK_TIMEOUT': int(os.getenv('JOBS_LOCK_TIMEOUT', default=300)),
+    'BACKOFF_BASE': 10,
+    'BACKOFF_MAX': 60 * 60,
+}
+
+# Вёдра токенов: CAPACITY — размер ведра, RATE — токенов в секунду.
+# BACKEND: local — в памяти процесса, shared — общий кэш CACHE_ALIAS
+THROTTLING = {
+    'ENABLED': os.getenv('THROTTLING_ENABLED', default='True') == 'True',
+    'BACKEND': os.getenv('THROTTLING_BACKEND', default='local'),
+    'CACHE_ALIAS': 'default',
+    'MAX_SIZE': 100000,
+    'USER': {
+        'CAPACITY': int(os.getenv('THROTTLING_USER_CAPACITY', default=120)),
+        'RATE': float(os.getenv('THROTTLING_USER_RATE', default=2)),
+    },
+    'ANON': {
+        'CAPACITY': int(os.getenv('THROTTLING_ANON_CAPACITY', default=60)),
+        'RATE': float(os.getenv('THROTTLING_ANON_RATE', default=1)),
+    },
+}
+
+# Бюджет запросов к базе на запрос к API, по умолчанию проверяется при DEBUG.
+# DEFAULT — для представлений без query_budgets, RAISE — падать при превышении
+QUERY_BUDGET = {
+    'ENABLED': os.getenv(
+        'QUERY_BUDGET_ENABLED', default=str(bool(DEBUG))
+    ) == 'True',
+    'RAISE': os.getenv('QUERY_BUDGET_RAISE', default='False') == 'True',
+    'DEFAULT': int(os.getenv('QUERY_BUDGET_DEFAULT', default=10)),
+}
+
+# Профилирование запросов: RATE — доля профилируемых запросов, кроме них
+# профилируются запросы с подписанным заголовком X-Profile. INTERVAL —
+# период снятия стеков, FLUSH_INTERVAL — сброса стеков в кэш CACHE_ALIAS
+PROFILING = {
+    'ENABLED': os.getenv('PROFILING_ENABLED', default='False') == 'True',
+    'RATE': float(os.getenv('PROFILING_RATE', default=0)),
+    'INTERVAL': 0.005,
+    'FLUSH_INTERVAL': 10,
+    'MAX_STACKS': 5000,
+    'CACHE_ALIAS': 'default',
+    'TOKEN_MAX_AGE': 60 * 60,
+}
+
+# Ограничения на размер запросов к API и рецептов
+PAYLOAD_LIMITS = {
+    'MAX_BODY_SIZE': int(
+        os.getenv('PAYLOAD_MAX_BODY_SIZE', default=10 * 1024 * 1024)
+    ),
+    'MAX_IMAGE_SIZE': int(
+        os.getenv('PAYLOAD_MAX_IMAGE_SIZE', default=5 * 1024 * 1024)
+    ),
+    'MAX_INGREDIENTS': int(os.getenv('PAYLOAD_MAX_INGREDIENTS', default=50)),
+    'MAX_TAGS': int(os.getenv('PAYLOAD_MAX_TAGS', default=20)),
+    'MAX_TEXT_LENGTH': int(
+        os.getenv('PAYLOAD_MAX_TEXT_LENGTH', default=10000)
+    ),
+}
+
+# Журнал изменений рецептов (/api/changes/)
+CHANGES = {
+    'RETENTION_DAYS': int(os.getenv('CHANGES_RETENTION_DAYS', default=7)),
+    'COMPACT_AFTER': 60 * 60,
+    'SAFETY_LAG': 1,
+    'PAGE_SIZE': 500,
+    'STREAM_TIMEOUT': int(os.getenv('CHANGES_STREAM_TIMEOUT', default=15)),
+    'STREAM_POLL_INTERVAL': 2,
 }
 
 DJOSER = {
@@ -0,0 +1,31 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class HashedFileSystemStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла — хэш его содержимого.
+
+    Изменённый файл получает новый URL, поэтому такие файлы можно отдавать
+    с бессрочными заголовками кэширования. Одинаковые файлы хранятся один раз.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        sha256 = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        digest = sha256.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        name = os.path.join(directory, digest[:2], digest + extension)
+        if self.exists(name):
+            return name.replace('\\', '/')
+        return super().save(name, content, max_length)
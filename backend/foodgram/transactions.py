@@ -0,0 +1,61 @@
+import threading
+import weakref
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+class _Hook:
+    """ Пустой колбэк on_commit: живёт, пока Django собирается его вызвать """
+
+    def __call__(self):
+        pass
+
+
+class _Flush:
+    def __init__(self, batch):
+        self.batch = batch
+
+    def __call__(self):
+        self.batch.flush()
+
+
+class OnCommitBatch:
+    """
+    Копит элементы до фиксации транзакции и передаёт их handler одним
+    вызовом, например одним INSERT или UPDATE вместо запроса на элемент.
+    Вне транзакции handler вызывается сразу.
+
+    На каждый элемент регистрируется свой колбэк transaction.on_commit,
+    а сам список хранит на него слабую ссылку. При откате точки сохранения
+    или всей транзакции Django выбрасывает колбэк, ссылка умирает, и
+    элемент не попадает в handler. Сброс регистрируется раньше колбэков
+    элементов, поэтому к моменту его вызова живы ссылки ровно на
+    зафиксированные элементы.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self._local = threading.local()
+
+    def add(self, item):
+        if not transaction.get_connection(DEFAULT_DB_ALIAS).in_atomic_block:
+            self.handler([item])
+            return
+        flush = getattr(self._local, 'flush', None)
+        if flush is None or flush() is None:
+            # Первый элемент транзакции или сброс откатили вместе с
+            # точкой сохранения, а с ним и все элементы до него.
+            flush = _Flush(self)
+            self._local.flush = weakref.ref(flush)
+            self._local.pending = []
+            transaction.on_commit(flush)
+        hook = _Hook()
+        self._local.pending.append((item, weakref.ref(hook)))
+        transaction.on_commit(hook)
+
+    def flush(self):
+        pending, self._local.pending = self._local.pending, []
+        self._local.flush = None
+        items = [item for item, hook in pending if hook() is not None]
+        if items:
+            self.handler(items)
@@ -0,0 +1,24 @@
+import gc
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+
+# Приложение загружается один раз в мастер-процессе, воркеры получают его
+# через fork и делят страницы памяти, пока не начнут их менять.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from django.db import connections
+    from django.urls import get_resolver
+
+    # URLconf иначе загружается первым запросом в каждом воркере,
+    # вместе с представлениями, сериализаторами и djoser.
+    get_resolver().url_patterns
+    connections.close_all()
+    # Сборщик мусора не будет трогать заголовки загруженных объектов,
+    # и страницы с ними останутся общими после fork.
+    gc.freeze()
@@ -0,0 +1,16 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'name', 'status', 'attempts', 'run_at', 'created_at',
+        'finished_at'
+    )
+    list_filter = ('status',)
+    search_fields = ('name', 'dedup_key')
+    show_full_result_count = False
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,51 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import work
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Число воркеров (потоков) в процессе.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1,
+            help='Пауза в секундах между опросами пустой очереди.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить накопившиеся задачи и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+
+        def worker():
+            try:
+                work(stop, options['poll_interval'], options['once'])
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=worker, name=f'jobs-worker-{number}')
+            for number in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(1)
@@ -0,0 +1,152 @@
+"""
+Очередь фоновых задач в таблице базы данных.
+
+Задача — функция, зарегистрированная декоратором ``task``. Её ставят в
+очередь через ``enqueue`` после фиксации текущей транзакции, а выполняют
+воркеры команды ``run_workers``: строка задачи забирается запросом
+``SELECT ... FOR UPDATE SKIP LOCKED``, поэтому несколько воркеров не
+получают одну и ту же задачу. Упавшая задача повторяется с
+экспоненциальной задержкой.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (DatabaseError, IntegrityError, close_old_connections,
+                       transaction)
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(func=None, *, max_attempts=5):
+    """ Регистрирует функцию как фоновую задачу """
+    def decorator(func):
+        func.task_name = f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        TASKS[func.task_name] = func
+        return func
+    return decorator(func) if func is not None else decorator
+
+
+def enqueue(func, dedup_key=None, delay=0, **payload):
+    """
+    Ставит задачу в очередь после фиксации текущей транзакции.
+
+    Пока в очереди есть невыполненная задача с тем же ``dedup_key``,
+    новая не добавляется. С JOBS['EAGER'] задача выполняется сразу,
+    без записи в таблицу.
+    """
+    def create():
+        if settings.JOBS['EAGER']:
+            func(**payload)
+            return
+        Job.objects.bulk_create([Job(
+            name=func.task_name,
+            payload=payload,
+            dedup_key=dedup_key,
+            max_attempts=func.max_attempts,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )], ignore_conflicts=True)
+    transaction.on_commit(create)
+
+
+def get_backoff(attempts):
+    return min(
+        settings.JOBS['BACKOFF_BASE'] * 2 ** (attempts - 1),
+        settings.JOBS['BACKOFF_MAX']
+    )
+
+
+def claim_job():
+    """
+    Забирает очередную задачу: готовую к запуску или зависшую у
+    воркера, который не уложился в JOBS['LOCK_TIMEOUT'].
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Job.PENDING, run_at__lte=now)
+                | Q(status=Job.RUNNING, locked_until__lt=now)
+            )
+            .order_by('run_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_until = now + timedelta(
+            seconds=settings.JOBS['LOCK_TIMEOUT']
+        )
+        job.save(update_fields=('status', 'attempts', 'locked_until'))
+    return job
+
+
+def finish_job(job, status, error=''):
+    job.status = status
+    job.last_error = error
+    job.locked_until = None
+    if status == Job.PENDING:
+        job.run_at = timezone.now() + timedelta(
+            seconds=get_backoff(job.attempts)
+        )
+    else:
+        job.finished_at = timezone.now()
+    fields = ('status', 'last_error', 'locked_until', 'run_at', 'finished_at')
+    try:
+        with transaction.atomic():
+            job.save(update_fields=fields)
+    except IntegrityError:
+        # Пока задача выполнялась, в очередь встала такая же: повтор не нужен.
+        job.status = Job.DONE
+        job.finished_at = timezone.now()
+        job.save(update_fields=fields)
+
+
+def run_job(job):
+    func = TASKS.get(job.name)
+    if func is None:
+        finish_job(job, Job.FAILED, f'Неизвестная задача {job.name}')
+        return
+    try:
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Задача %s #%s упала', job.name, job.id)
+        if job.attempts < job.max_attempts:
+            finish_job(job, Job.PENDING, error)
+        else:
+            finish_job(job, Job.FAILED, error)
+    else:
+        finish_job(job, Job.DONE)
+
+
+def work(stop, poll_interval=1, once=False):
+    """
+    Цикл воркера: выполняет задачи, пока они есть, и ждёт новых.
+    С once=True завершается, когда очередь опустела.
+    """
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            job = claim_job()
+        except DatabaseError:
+            logger.exception('Не удалось получить задачу из очереди')
+            stop.wait(poll_interval)
+            continue
+        if job is not None:
+            run_job(job)
+        elif once:
+            break
+        else:
+            stop.wait(poll_interval)
+    close_old_connections()
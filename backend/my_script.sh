@@ -1,4 +1,3 @@
 #!/bin/bash
-python manage.py migrate &&
-python manage.py collectstatic --no-input
+python manage.py prepare_start &&
 exec "$@"
\ No newline at end of file
@@ -1,7 +1,24 @@
 from django.contrib import admin
-
-from .models import (Cart, Ingredient, IngredientInRecipe, Recipe, Tag,
-                     TagInRecipe)
+from django.contrib.postgres.aggregates import StringAgg
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .ingredient_index import refresh_ingredient_ids
+from .models import (Cart, Favorite, Ingredient, IngredientInRecipe, MealPlan,
+                     MealPlanEntry, Recipe, Tag, TagInRecipe)
+
+
+def aggregate_subquery(queryset, aggregate):
+    """
+    Агрегат по связанным строкам рецепта отдельным подзапросом, чтобы
+    несколько таких колонок не перемножали строки в одном JOIN.
+    """
+    return Subquery(
+        queryset.filter(recipe=OuterRef('pk'))
+        .values('recipe')
+        .annotate(value=aggregate)
+        .values('value')
+    )
 
 
 class TagAdmin(admin.ModelAdmin):
@@ -11,38 +28,97 @@ class TagAdmin(admin.ModelAdmin):
 
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'measurement_unit')
-    list_filter = ('name', 'measurement_unit')
+    list_filter = ('measurement_unit',)
     search_fields = ('name',)
+    ordering = ('name',)
 
 
 class IngredientInRecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'recipe', 'ingredient', 'amount')
-    search_fields = ('recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    search_fields = ('recipe__name', 'ingredient__name')
+    autocomplete_fields = ('recipe', 'ingredient')
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Строку могли перенести в другой рецепт, новый обновит сигнал.
+        old_recipe = form.initial.get('recipe', obj.recipe_id)
+        if old_recipe != obj.recipe_id:
+            refresh_ingredient_ids(Recipe.objects.filter(pk=old_recipe))
 
-class TagsInLine(admin.StackedInline):
+
+class TagsInLine(admin.TabularInline):
     model = TagInRecipe
+    extra = 0
+    autocomplete_fields = ('tag',)
 
 
-class IngredientsInLine(admin.StackedInline):
+class IngredientsInLine(admin.TabularInline):
     model = IngredientInRecipe
+    extra = 0
+    autocomplete_fields = ('ingredient',)
 
 
 class RecipeAdmin(admin.ModelAdmin):
     list_display = (
-        'name', 'text', 'cooking_time', 'pub_date',
-        'display_ingredients', 'display_tags', 'favorites'
+        'name', 'text', 'author', 'cooking_time', 'pub_date',
+        'ingredients_list', 'tags_list', 'favorites'
     )
-    list_filter = ('name', 'author', 'tags')
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('name', 'author__username', 'author__email')
+    autocomplete_fields = ('author',)
+    show_full_result_count = False
     inlines = (TagsInLine, IngredientsInLine)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            ingredients_names=aggregate_subquery(
+                IngredientInRecipe.objects,
+                StringAgg(
+                    'ingredient__name', ', ', ordering='ingredient__name'
+                )
+            ),
+            tags_names=aggregate_subquery(
+                TagInRecipe.objects,
+                StringAgg('tag__name', ', ', ordering='tag__name')
+            ),
+            favorites_count=Coalesce(
+                aggregate_subquery(Favorite.objects, Count('id')), 0
+            ),
+        )
+
+    def ingredients_list(self, obj):
+        return obj.ingredients_names
+    ingredients_list.short_description = 'Ингредиенты'
+
+    def tags_list(self, obj):
+        return obj.tags_names
+    tags_list.short_description = 'Тэги'
+
     def favorites(self, obj):
-        return obj.favorite_recipe.all().count()
+        return obj.favorites_count
     favorites.short_description = 'В избранном'
+    favorites.admin_order_field = 'favorites_count'
 
 
 class CartAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+
+
+class MealPlanEntryInLine(admin.TabularInline):
+    model = MealPlanEntry
+    extra = 0
+    autocomplete_fields = ('recipe',)
+
+
+class MealPlanAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'created_at')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+    inlines = (MealPlanEntryInLine,)
 
 
 admin.site.register(Tag, TagAdmin)
@@ -50,3 +126,4 @@ admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(IngredientInRecipe, IngredientInRecipeAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Cart, CartAdmin)
+admin.site.register(MealPlan, MealPlanAdmin)
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class ReceiptsConfig(AppConfig):
     name = 'recipes'
+
+    def ready(self):
+        from .ingredient_index import ingredients_changed
+        from .models import IngredientInRecipe
+
+        post_save.connect(ingredients_changed, sender=IngredientInRecipe)
+        post_delete.connect(ingredients_changed, sender=IngredientInRecipe)
@@ -0,0 +1,71 @@
+"""
+Обратный индекс «ингредиент → рецепты» для фильтров по ингредиентам.
+
+Каждый рецепт хранит отсортированные id своих ингредиентов в массиве
+Recipe.ingredient_ids с GIN-индексом. Фильтр «есть все ингредиенты»
+сводится к одному условию ``ingredient_ids @> массив``, которое ищется по
+индексу, а исключение аллергенов — к ``NOT ingredient_ids && массив``
+без соединений с IngredientInRecipe на каждый ингредиент.
+
+Массив заполняют сериализатор и загрузка NDJSON, которые создают
+ингредиенты рецепта bulk_create без сигналов. Остальные правки
+IngredientInRecipe (админка, loaddata, удаление) обновляют его сигналами,
+подключёнными в recipes/apps.py.
+"""
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from foodgram.transactions import OnCommitBatch
+
+from .models import IngredientInRecipe, Recipe
+
+
+def get_ingredient_ids(ingredients):
+    """ Значение ingredient_ids для списка ингредиентов или их id """
+    return sorted({getattr(item, 'id', item) for item in ingredients})
+
+
+def refresh_ingredient_ids(recipes):
+    """ Пересчитывает ingredient_ids рецептов queryset одним UPDATE """
+    return recipes.update(ingredient_ids=Coalesce(
+        Subquery(
+            IngredientInRecipe.objects.filter(recipe=OuterRef('pk'))
+            .values('recipe')
+            .annotate(ids=ArrayAgg(
+                'ingredient_id', distinct=True, ordering='ingredient_id'
+            ))
+            .values('ids')
+        ),
+        Value([], output_field=ArrayField(IntegerField()))
+    ))
+
+
+def refresh_recipes(recipe_ids):
+    refresh_ingredient_ids(Recipe.objects.filter(pk__in=set(recipe_ids)))
+
+
+pending_recipes = OnCommitBatch(refresh_recipes)
+
+
+def ingredients_changed(sender, instance, **kwargs):
+    """
+    Пересчитывает ingredient_ids рецепта после сохранения или удаления
+    строки. В транзакции рецепты копятся и обновляются одним UPDATE после
+    фиксации, так что loaddata и удаление рецепта не дают UPDATE на строку.
+    """
+    pending_recipes.add(instance.recipe_id)
+
+
+def filter_by_ingredients(recipes, include=(), exclude=()):
+    """ Рецепты со всеми ингредиентами include и без единого из exclude """
+    if include:
+        recipes = recipes.filter(
+            ingredient_ids__contains=get_ingredient_ids(include)
+        )
+    if exclude:
+        recipes = recipes.exclude(
+            ingredient_ids__overlap=get_ingredient_ids(exclude)
+        )
+    return recipes
@@ -0,0 +1,53 @@
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.recommendations import (SIMILARITY_BATCH_SIZE, SIMILARITY_TOP_K,
+                                     build_similarity, get_stale_recipes)
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассчитывает похожие рецепты по избранному, корзинам, тегам и '
+        'ингредиентам. По умолчанию пересчитываются только рецепты, '
+        'изменённые после прошлого запуска; новое избранное и корзины '
+        'рецепт не меняют и учитываются только с --full.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать все рецепты.',
+        )
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=SIMILARITY_TOP_K,
+            help='Сколько соседей хранить для каждого рецепта.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SIMILARITY_BATCH_SIZE,
+            help='Сколько рецептов обрабатывать одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['full']:
+            recipe_ids = Recipe.objects.values_list(
+                'id', flat=True
+            ).order_by('id')
+        else:
+            recipe_ids = get_stale_recipes()
+        count = build_similarity(
+            recipe_ids, options['top_k'], options['batch_size']
+        )
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецептов пересчитано: {count} за '
+            f'{time.monotonic() - started:.1f} с, пик памяти {peak} МБ'
+        ))
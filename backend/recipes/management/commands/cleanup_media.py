@@ -0,0 +1,55 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из каталога загрузки изображения рецептов, на которые не '
+        'ссылается ни один рецепт (например, заменённые при редактировании).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать файлы, которые будут удалены.',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60 * 60,
+            help='Не трогать файлы моложе указанного числа секунд.',
+        )
+
+    def handle(self, *args, **options):
+        referenced = set(
+            Recipe.objects.exclude(image='').values_list('image', flat=True)
+        )
+        threshold = time.time() - options['min_age']
+        removed = 0
+        freed = 0
+        # Остальные файлы MEDIA_ROOT рецептам не принадлежат.
+        upload_to = Recipe._meta.get_field('image').upload_to
+        directory = os.path.join(settings.MEDIA_ROOT, upload_to)
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, settings.MEDIA_ROOT).replace(
+                    os.sep, '/'
+                )
+                if name in referenced or os.path.getmtime(path) > threshold:
+                    continue
+                removed += 1
+                freed += os.path.getsize(path)
+                self.stdout.write(name)
+                if not options['dry_run']:
+                    os.remove(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов без ссылок: {removed}, {freed // 1024} КБ'
+            + (' (не удалены, --dry-run)' if options['dry_run'] else '')
+        ))
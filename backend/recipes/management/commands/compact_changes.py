@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, Max, OuterRef, Q
+from django.utils import timezone
+
+from recipes.models import RecipeChange, RecipeChangeHorizon
+
+DELETE_BATCH_SIZE = 10000
+
+
+def delete_in_batches(queryset):
+    """ Удаляет пачками, чтобы не держать долгие блокировки """
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('id', flat=True)[:DELETE_BATCH_SIZE])
+        if not ids:
+            return deleted
+        deleted += RecipeChange.objects.filter(id__in=ids).delete()[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сжимает журнал изменений рецептов: удаляет записи старше срока '
+        'хранения и записи, для которых есть более новое изменение того же '
+        'объекта.'
+    )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        changes_options = settings.CHANGES
+        retention = now - timedelta(days=changes_options['RETENTION_DAYS'])
+        last_deleted_id = RecipeChange.objects.filter(
+            created_at__lt=retention
+        ).aggregate(last_id=Max('id'))['last_id']
+        expired = 0
+        if last_deleted_id is not None:
+            # Граница сдвигается до удаления: клиент со старым курсором
+            # получит 410, а не пропущенные изменения.
+            RecipeChangeHorizon.objects.update_or_create(
+                id=1, defaults={'last_deleted_id': last_deleted_id}
+            )
+            expired = delete_in_batches(
+                RecipeChange.objects.filter(id__lte=last_deleted_id)
+            )
+        newer = RecipeChange.objects.filter(
+            Q(user_id=OuterRef('user_id')) | Q(user_id__isnull=True),
+            kind=OuterRef('kind'),
+            recipe_id=OuterRef('recipe_id'),
+            id__gt=OuterRef('id'),
+        )
+        compacted = delete_in_batches(
+            RecipeChange.objects.filter(
+                Exists(newer),
+                created_at__lt=now - timedelta(
+                    seconds=changes_options['COMPACT_AFTER']
+                ),
+            ).order_by('id')
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено по сроку хранения: {expired}, '
+            f'повторных изменений: {compacted}'
+        ))
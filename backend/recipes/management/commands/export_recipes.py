@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from recipes.ndjson import (IMAGES_INLINE, IMAGES_REFERENCE, Checkpoint,
+                            export_partition, get_partitions)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая выгрузка рецептов в NDJSON. С --workers N рецепты делятся '
+        'на N диапазонов id, каждый выгружается в свой файл '
+        '<output>.<номер> параллельно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Файл для выгрузки.')
+        parser.add_argument(
+            '--images',
+            choices=(IMAGES_REFERENCE, IMAGES_INLINE),
+            default=IMAGES_REFERENCE,
+            help='Изображения ссылками на файлы или внутри файла (base64).',
+        )
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки, чтобы продолжить прерванную '
+                 'выгрузку.',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers должно быть больше нуля')
+        checkpoint = Checkpoint(options['checkpoint'])
+        partitions = get_partitions(options['workers'])
+        total = 0
+        lock = threading.Lock()
+        started = time.monotonic()
+
+        def export(number, first_id, last_id):
+            path = options['output']
+            if len(partitions) > 1:
+                path = f'{path}.{number}'
+            position = checkpoint.get(path)
+            with open(path, 'r+b' if position else 'wb') as file:
+                if position:
+                    # Строки после контрольной точки могли записаться не
+                    # полностью: отрезаем их и продолжаем со следующего id.
+                    file.truncate(position['offset'])
+                    file.seek(position['offset'])
+                    first_id = position['last_id'] + 1
+
+                def on_chunk(last_exported_id, count):
+                    nonlocal total
+                    file.flush()
+                    checkpoint.set(path, {
+                        'last_id': last_exported_id, 'offset': file.tell()
+                    })
+                    with lock:
+                        total += count
+                        self.stdout.write(
+                            f'{total} рецептов, '
+                            f'{total / (time.monotonic() - started):.0f}/с'
+                        )
+
+                try:
+                    export_partition(
+                        file, first_id, last_id,
+                        options['images'], options['chunk_size'], on_chunk
+                    )
+                finally:
+                    connection.close()
+            return path
+
+        with ThreadPoolExecutor(options['workers']) as executor:
+            paths = list(executor.map(
+                lambda args: export(*args),
+                [
+                    (number, first_id, last_id)
+                    for number, (first_id, last_id) in enumerate(partitions)
+                ]
+            ))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено рецептов: {total} за {elapsed:.1f} с '
+            f'({total / elapsed if elapsed else 0:.0f}/с): '
+            + ', '.join(os.path.basename(path) for path in paths)
+        ))
@@ -0,0 +1,61 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from recipes.ndjson import (Checkpoint, RecipeImporter, import_file,
+                            reset_sequences)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая загрузка рецептов из NDJSON-файлов export_recipes. '
+        'Файлы разных диапазонов id загружаются параллельно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Файлы выгрузки.')
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки, чтобы продолжить прерванную '
+                 'загрузку.',
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = Checkpoint(options['checkpoint'])
+        importer = RecipeImporter()
+        totals = {'imported': 0, 'skipped': 0}
+        lock = threading.Lock()
+        started = time.monotonic()
+
+        def on_batch(imported, skipped):
+            with lock:
+                totals['imported'] += imported
+                totals['skipped'] += skipped
+                rate = totals['imported'] / (time.monotonic() - started)
+                self.stdout.write(
+                    f'{totals["imported"]} рецептов, {rate:.0f}/с'
+                )
+
+        def load(path):
+            try:
+                import_file(
+                    path, importer, options['batch_size'], checkpoint,
+                    on_batch
+                )
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(options['workers']) as executor:
+            list(executor.map(load, options['files']))
+        reset_sequences()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено рецептов: {totals["imported"]}, пропущено: '
+            f'{totals["skipped"]} за {elapsed:.1f} с '
+            f'({totals["imported"] / elapsed if elapsed else 0:.0f}/с)'
+        ))
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:11
+
+from django.db import migrations, models
+import foodgram.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=foodgram.storage.HashedFileSystemStorage(), upload_to='recipes/', verbose_name='Фото блюда'),
+        ),
+    ]
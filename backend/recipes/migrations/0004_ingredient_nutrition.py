@@ -0,0 +1,43 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_image_hashed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='calories',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True, verbose_name='Калорийность, ккал на единицу измерения'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='carbohydrates',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True, verbose_name='Углеводы, г на единицу измерения'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='fats',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True, verbose_name='Жиры, г на единицу измерения'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True, verbose_name='Цена, руб. за единицу измерения'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='proteins',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True, verbose_name='Белки, г на единицу измерения'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('recipe', 'Рецепт'), ('favorite', 'Избранное'), ('cart', 'Список покупок')], max_length=16)),
+                ('action', models.CharField(choices=[('changed', 'Изменён'), ('deleted', 'Удалён')], max_length=16)),
+                ('recipe_id', models.PositiveIntegerField()),
+                ('user_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Изменение',
+                'verbose_name_plural': 'Журнал изменений',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeChangeHorizon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_deleted_id', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Граница журнала изменений',
+                'verbose_name_plural': 'Граница журнала изменений',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipechange',
+            index=models.Index(fields=['kind', 'recipe_id', 'user_id'], name='recipe_change_key_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.16 on 2026-10-19 11:04
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.RunSQL(
+            '''
+            UPDATE recipes_recipe SET ingredient_ids = COALESCE((
+                SELECT array_agg(DISTINCT ingredient_id ORDER BY ingredient_id)
+                FROM recipes_ingredientinrecipe
+                WHERE recipe_id = recipes_recipe.id
+            ), '{}')
+            ''',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['ingredient_ids'], name='recipe_ingredient_ids_gin'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.16 on 2026-10-19 12:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Базы, заполненные loaddata до сигналов на IngredientInRecipe,
+    остались с пустыми ingredient_ids.
+    """
+
+    dependencies = [
+        ('recipes', '0009_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            '''
+            UPDATE recipes_recipe SET ingredient_ids = COALESCE((
+                SELECT array_agg(DISTINCT ingredient_id ORDER BY ingredient_id)
+                FROM recipes_ingredientinrecipe
+                WHERE recipe_id = recipes_recipe.id
+            ), '{}')
+            ''',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,9 +1,13 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.db.models import UniqueConstraint
 
+from foodgram.storage import HashedFileSystemStorage
 from users.models import User
+
 from .validators import validate_time
 
 
@@ -11,6 +15,10 @@ class Tag(models.Model):
     name = models.CharField(verbose_name='Тэг', max_length=200, unique=True)
     color = ColorField(verbose_name='Цвет', default='#49B64E', unique=True)
     slug = models.SlugField(verbose_name='Ссылка', unique=True,)
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
 
     class Meta:
         verbose_name = 'Тэг'
@@ -32,6 +40,45 @@ class Ingredient(models.Model):
         max_length=200,
         blank=False
     )
+    calories = models.DecimalField(
+        verbose_name='Калорийность, ккал на единицу измерения',
+        max_digits=10,
+        decimal_places=4,
+        null=True,
+        blank=True
+    )
+    proteins = models.DecimalField(
+        verbose_name='Белки, г на единицу измерения',
+        max_digits=10,
+        decimal_places=4,
+        null=True,
+        blank=True
+    )
+    fats = models.DecimalField(
+        verbose_name='Жиры, г на единицу измерения',
+        max_digits=10,
+        decimal_places=4,
+        null=True,
+        blank=True
+    )
+    carbohydrates = models.DecimalField(
+        verbose_name='Углеводы, г на единицу измерения',
+        max_digits=10,
+        decimal_places=4,
+        null=True,
+        blank=True
+    )
+    price = models.DecimalField(
+        verbose_name='Цена, руб. за единицу измерения',
+        max_digits=10,
+        decimal_places=4,
+        null=True,
+        blank=True
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
 
     class Meta:
         verbose_name = 'Ингредиент'
@@ -50,7 +97,9 @@ class Recipe(models.Model):
     text = models.TextField(verbose_name='Описание')
     image = models.ImageField(
         verbose_name='Фото блюда',
-        blank=False
+        blank=False,
+        upload_to='recipes/',
+        storage=HashedFileSystemStorage()
     )
     cooking_time = models.IntegerField(
         verbose_name='Время приготовления',
@@ -74,10 +123,27 @@ class Recipe(models.Model):
         through='IngredientInRecipe',
         related_name='recipes',
     )
+    # Обратный индекс для фильтров по ингредиентам: отсортированные id
+    # ингредиентов рецепта, обновляются при сохранении ингредиентов.
+    ingredient_ids = ArrayField(
+        models.IntegerField(),
+        default=list,
+        blank=True,
+        editable=False,
+    )
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            GinIndex(
+                fields=['ingredient_ids'], name='recipe_ingredient_ids_gin'
+            ),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -195,3 +261,148 @@ class Cart(models.Model):
         ]
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Список покупок'
+
+
+class MealPlan(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='meal_plans',
+        verbose_name='Пользователь',
+    )
+    name = models.CharField(verbose_name='Название плана', max_length=200)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'План питания'
+        verbose_name_plural = 'Планы питания'
+
+    def __str__(self):
+        return self.name
+
+
+class MealPlanEntry(models.Model):
+    plan = models.ForeignKey(
+        MealPlan,
+        on_delete=models.CASCADE,
+        related_name='entries',
+        verbose_name='План питания',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='meal_plan_entries',
+        verbose_name='Рецепт',
+    )
+    date = models.DateField(verbose_name='День')
+    servings = models.PositiveSmallIntegerField(
+        verbose_name='Количество порций',
+        default=1,
+        validators=[MinValueValidator(1, 'Минимум одна порция')]
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+
+    class Meta:
+        ordering = ['date', 'id']
+        verbose_name = 'Рецепт в плане питания'
+        verbose_name_plural = 'Рецепты в плане питания'
+        constraints = [
+            UniqueConstraint(
+                fields=['plan', 'date', 'recipe'],
+                name='recipe_in_meal_plan_unique'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['plan', 'date'],
+                name='meal_plan_entry_date_idx'
+            )
+        ]
+
+
+class RecipeSimilarity(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField(verbose_name='Сходство')
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='recipe_similarity_unique'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='recipe_similarity_score_idx'
+            )
+        ]
+
+
+class RecipeChange(models.Model):
+    """
+    Журнал изменений рецептов, избранного и корзин для инкрементальной
+    синхронизации клиентов. Записи только добавляются; id служит курсором.
+    """
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    CART = 'cart'
+    KINDS = (
+        (RECIPE, 'Рецепт'),
+        (FAVORITE, 'Избранное'),
+        (CART, 'Список покупок'),
+    )
+    CHANGED = 'changed'
+    DELETED = 'deleted'
+    ACTIONS = (
+        (CHANGED, 'Изменён'),
+        (DELETED, 'Удалён'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=16, choices=KINDS)
+    action = models.CharField(max_length=16, choices=ACTIONS)
+    recipe_id = models.PositiveIntegerField()
+    # Для избранного и корзины — владелец, изменения видны только ему.
+    user_id = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        indexes = [
+            models.Index(
+                fields=['kind', 'recipe_id', 'user_id'],
+                name='recipe_change_key_idx'
+            )
+        ]
+
+
+class RecipeChangeHorizon(models.Model):
+    """
+    Последний id журнала, удалённый по сроку хранения. Клиенту с более
+    старым курсором нужна полная синхронизация.
+    """
+    last_deleted_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Граница журнала изменений'
+        verbose_name_plural = 'Граница журнала изменений'
@@ -0,0 +1,146 @@
+"""
+Офлайн-расчёт похожих рецептов.
+
+Сходство пары рецептов складывается из нескольких сигналов: совместное
+добавление в избранное и в корзину одними пользователями (косинусная мера)
+и пересечение тегов и ингредиентов (мера Жаккара). Совместные счётчики
+считаются в базе данных агрегирующими запросами по пачкам рецептов, так что
+в памяти одновременно находится только разреженный кусок матрицы сходства
+для одной пачки. Для каждого рецепта сохраняются top-K соседей.
+"""
+import heapq
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+
+from .models import (Cart, Favorite, IngredientInRecipe, Recipe,
+                     RecipeSimilarity, TagInRecipe)
+
+SIMILARITY_TOP_K = 20
+SIMILARITY_BATCH_SIZE = 200
+
+
+def cosine(count, size, other_size):
+    return count / math.sqrt(size * other_size)
+
+
+def jaccard(count, size, other_size):
+    return count / (size + other_size - count)
+
+
+# (модель связи, путь к рецептам с тем же объектом связи, вес, мера)
+SIGNALS = (
+    (Favorite, 'user__favorite__recipe', 1.0, cosine),
+    (Cart, 'user__shopping_cart__recipe', 0.5, cosine),
+    (TagInRecipe, 'tag__recipe_tags__recipe', 0.2, jaccard),
+    (IngredientInRecipe, 'ingredient__ingredient__recipe', 0.3, jaccard),
+)
+
+
+def get_sizes(model):
+    return dict(
+        model.objects.values_list('recipe')
+        .annotate(size=Count('id'))
+        .order_by()
+    )
+
+
+def get_pair_counts(model, other, batch):
+    return (
+        model.objects.filter(recipe__in=batch)
+        .values_list('recipe', other)
+        .annotate(count=Count('id'))
+        .order_by()
+        .iterator()
+    )
+
+
+def compute_neighbours(batch, sizes, top_k=SIMILARITY_TOP_K):
+    scores = defaultdict(lambda: defaultdict(float))
+    for (model, other, weight, measure), model_sizes in zip(SIGNALS, sizes):
+        for recipe, similar, count in get_pair_counts(model, other, batch):
+            if recipe == similar:
+                continue
+            scores[recipe][similar] += weight * measure(
+                count, model_sizes[recipe], model_sizes[similar]
+            )
+    return {
+        recipe: heapq.nlargest(top_k, similar.items(), key=lambda x: x[1])
+        for recipe, similar in scores.items()
+    }
+
+
+def get_stale_recipes():
+    """
+    Рецепты, изменённые после прошлого расчёта, рецепты без рассчитанных
+    соседей и рецепты, у которых изменённые рецепты были в соседях.
+    """
+    last_run = RecipeSimilarity.objects.aggregate(
+        last_run=Max('computed_at')
+    )['last_run']
+    if last_run is None:
+        return Recipe.objects.values_list('id', flat=True).order_by('id')
+    changed = Recipe.objects.filter(updated_at__gte=last_run).values('id')
+    return (
+        Recipe.objects.filter(
+            Q(id__in=changed)
+            | Q(similar_recipes__isnull=True)
+            | Q(similar_recipes__similar__in=changed)
+        )
+        .values_list('id', flat=True)
+        .distinct()
+        .order_by('id')
+    )
+
+
+def build_similarity(recipe_ids, top_k=SIMILARITY_TOP_K,
+                     batch_size=SIMILARITY_BATCH_SIZE):
+    """
+    Пересчитывает соседей для переданных рецептов.
+    Возвращает число обработанных рецептов.
+    """
+    recipe_ids = list(recipe_ids)
+    sizes = [get_sizes(model) for model, *_ in SIGNALS]
+    for start in range(0, len(recipe_ids), batch_size):
+        batch = recipe_ids[start:start + batch_size]
+        neighbours = compute_neighbours(batch, sizes, top_k)
+        with transaction.atomic():
+            RecipeSimilarity.objects.filter(recipe__in=batch).delete()
+            RecipeSimilarity.objects.bulk_create(
+                RecipeSimilarity(
+                    recipe_id=recipe, similar_id=similar, score=score
+                )
+                for recipe, similar_scores in neighbours.items()
+                for similar, score in similar_scores
+            )
+    return len(recipe_ids)
+
+
+def get_similar_recipes(recipe_id, limit=SIMILARITY_TOP_K):
+    return Recipe.objects.filter(
+        similar_to__recipe_id=recipe_id
+    ).order_by('-similar_to__score')[:limit]
+
+
+def get_recommended_recipes(user, limit=SIMILARITY_TOP_K):
+    """
+    Соседи рецептов из избранного и корзины пользователя, которых у него
+    ещё нет, ранжированные по суммарному сходству.
+    """
+    seeds = (
+        Q(similar_to__recipe__in=Favorite.objects.filter(
+            user=user
+        ).values('recipe'))
+        | Q(similar_to__recipe__in=Cart.objects.filter(
+            user=user
+        ).values('recipe'))
+    )
+    return (
+        Recipe.objects.filter(seeds)
+        .exclude(favorite_recipe__user=user)
+        .exclude(recipe_in_shopping_cart__user=user)
+        .annotate(rank=Sum('similar_to__score'))
+        .order_by('-rank', 'id')[:limit]
+    )
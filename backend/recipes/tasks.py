@@ -0,0 +1,8 @@
+from jobs.queue import task
+
+from .recommendations import build_similarity, get_stale_recipes
+
+
+@task
+def refresh_recommendations():
+    build_similarity(get_stale_recipes())
@@ -0,0 +1,116 @@
+"""
+Приведение единиц измерения ингредиентов и сведение списка покупок.
+
+Единицы измерения ингредиентов — свободный текст. Таблица UNITS
+компилируется один раз при импорте: нормализованное написание единицы
+отображается в величину (масса, объём), каноническую единицу и множитель.
+Единицы, которых нет в таблице (шт., пучок, банка), не конвертируются и
+суммируются только сами с собой.
+"""
+from decimal import Decimal
+
+MASS = 'mass'
+VOLUME = 'volume'
+TO_TASTE = 'to_taste'
+
+TO_TASTE_UNIT = 'по вкусу'
+
+# Единица: (величина, множитель к канонической единице)
+UNIT_DEFINITIONS = {
+    MASS: {
+        'мг': '0.001',
+        'г': '1',
+        'гр': '1',
+        'грамм': '1',
+        'кг': '1000',
+    },
+    VOLUME: {
+        'мл': '1',
+        'л': '1000',
+        'капля': '0.05',
+        'ч. л.': '5',
+        'ст. л.': '15',
+        'стакан': '250',
+    },
+}
+
+# Метрические единицы для вывода: от большей к меньшей
+DISPLAY_UNITS = {
+    MASS: (('кг', Decimal(1000)), ('г', Decimal(1))),
+    VOLUME: (('л', Decimal(1000)), ('мл', Decimal(1))),
+}
+
+
+def normalize_unit(unit):
+    return ''.join(unit.lower().replace('.', ' ').split())
+
+
+def compile_units():
+    units = {normalize_unit(TO_TASTE_UNIT): (TO_TASTE, Decimal(0))}
+    for dimension, definitions in UNIT_DEFINITIONS.items():
+        for unit, factor in definitions.items():
+            units[normalize_unit(unit)] = (dimension, Decimal(factor))
+    return units
+
+
+UNITS = compile_units()
+
+
+def format_amount(amount):
+    amount = amount.quantize(Decimal('0.01')).normalize()
+    return f'{amount:f}'
+
+
+class ShoppingListItem:
+    __slots__ = ('name', 'dimension', 'amount', 'units')
+
+    def __init__(self, name, dimension):
+        self.name = name
+        self.dimension = dimension
+        self.amount = Decimal(0)
+        self.units = set()
+
+    def render(self):
+        if self.dimension == TO_TASTE:
+            return f'{self.name} - {TO_TASTE_UNIT}'
+        if self.dimension not in DISPLAY_UNITS:
+            amount = format_amount(self.amount)
+            return f'{self.name} - {amount} {self.dimension}'
+        if len(self.units) == 1:
+            # Одна кухонная единица (ст. л., стакан) выводится как есть.
+            unit, = self.units
+            factor = UNITS[normalize_unit(unit)][1]
+            if unit not in dict(DISPLAY_UNITS[self.dimension]):
+                return (
+                    f'{self.name} - {format_amount(self.amount / factor)} '
+                    f'{unit}'
+                )
+        for unit, factor in DISPLAY_UNITS[self.dimension]:
+            if self.amount >= factor:
+                break
+        return f'{self.name} - {format_amount(self.amount / factor)} {unit}'
+
+
+def build_shopping_list(rows):
+    """
+    Сводит строки (название, единица, количество) в список покупок за один
+    проход: совместимые количества одного ингредиента переводятся в
+    каноническую единицу и складываются. Возвращает строки для вывода.
+    """
+    items = {}
+    for name, unit, amount in rows:
+        normalized = normalize_unit(unit)
+        dimension, factor = UNITS.get(normalized, (unit.strip(), None))
+        key = (
+            name.strip().lower(),
+            normalized if factor is None else dimension
+        )
+        item = items.get(key)
+        if item is None:
+            item = items[key] = ShoppingListItem(name.strip(), dimension)
+        if factor is None:
+            item.amount += amount
+        else:
+            item.amount += amount * factor
+        item.units.add(unit)
+    return [items[key].render() for key in sorted(items)]
@@ -0,0 +1,105 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from recipes.ingredient_index import refresh_ingredient_ids
+from recipes.models import (Ingredient, IngredientInRecipe, Recipe, Tag,
+                            TagInRecipe)
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def test_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.THROTTLING = {**settings.THROTTLING, 'ENABLED': False}
+    cache.clear()
+
+
+def make_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='password',
+        first_name=username,
+        last_name=username,
+    )
+
+
+def make_client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def user(db):
+    return make_user('user')
+
+
+@pytest.fixture
+def author(db):
+    return make_user('author')
+
+
+@pytest.fixture
+def user_client(user):
+    return make_client(user)
+
+
+@pytest.fixture
+def author_client(author):
+    return make_client(author)
+
+
+@pytest.fixture
+def anon_client():
+    return make_client()
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=f'Тэг {i}', slug=f'tag{i}', color=f'#00000{i}')
+        for i in range(2)
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(
+            name=f'Ингредиент {i}', measurement_unit='г',
+            calories=i + 1, price=10
+        )
+        for i in range(4)
+    ]
+
+
+@pytest.fixture
+def make_recipe(author, tags, ingredients):
+    def make_recipe(name='Рецепт', author=author, tags=tags,
+                    ingredients=ingredients):
+        recipe = Recipe.objects.create(
+            name=name,
+            text='Описание',
+            image='recipes/recipe.png',
+            cooking_time=10,
+            author=author,
+        )
+        TagInRecipe.objects.bulk_create(
+            TagInRecipe(recipe=recipe, tag=tag) for tag in tags
+        )
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=i)
+            for i, ingredient in enumerate(ingredients, 1)
+        )
+        refresh_ingredient_ids(Recipe.objects.filter(pk=recipe.pk))
+        recipe.refresh_from_db()
+        return recipe
+    return make_recipe
+
+
+@pytest.fixture
+def recipe(make_recipe):
+    return make_recipe()
@@ -0,0 +1,47 @@
+import pytest
+from django.contrib import admin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from recipes.models import Cart, Favorite, MealPlan, MealPlanEntry
+from users.models import Subscribe
+
+CHANGELISTS = [
+    reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}'
+            '_changelist')
+    for model in admin.site._registry
+    if model._meta.app_label in ('recipes', 'users')
+]
+
+
+def add_rows(make_recipe, user, author, count):
+    for i in range(count):
+        recipe = make_recipe(f'Рецепт {i}')
+        Favorite.objects.create(user=user, recipe=recipe)
+        Cart.objects.create(user=user, recipe=recipe)
+        plan = MealPlan.objects.create(user=user, name=f'План {i}')
+        MealPlanEntry.objects.create(
+            plan=plan, recipe=recipe, date=f'2023-01-0{i + 1}'
+        )
+    Subscribe.objects.get_or_create(user=user, author=author)
+
+
+@pytest.mark.parametrize('url', CHANGELISTS)
+def test_changelist_queries_do_not_grow(admin_client, make_recipe, user,
+                                        author, url,
+                                        django_assert_num_queries):
+    add_rows(make_recipe, user, author, 1)
+    with CaptureQueriesContext(connection) as context:
+        assert admin_client.get(url).status_code == 200
+    add_rows(make_recipe, user, author, 4)
+    with django_assert_num_queries(len(context.captured_queries)):
+        response = admin_client.get(url)
+    assert response.status_code == 200
+
+
+def test_recipe_changelist_columns(admin_client, recipe):
+    response = admin_client.get(reverse('admin:recipes_recipe_changelist'))
+    content = response.content.decode()
+    for value in (recipe.text, 'Ингредиент 0', 'Тэг 1'):
+        assert value in content
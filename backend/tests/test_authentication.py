@@ -0,0 +1,67 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import authentication
+
+ME_URL = '/api/users/me/'
+
+
+@pytest.fixture(autouse=True)
+def token_cache(monkeypatch):
+    monkeypatch.setattr(authentication, '_token_cache', None)
+
+
+@pytest.fixture
+def token_client(user):
+    token = Token.objects.create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def token_queries(client):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(ME_URL)
+    return response, [
+        query['sql'] for query in context.captured_queries
+        if 'authtoken_token' in query['sql']
+    ]
+
+
+def test_cached_token_skips_database(token_client, user):
+    response, queries = token_queries(token_client)
+    assert response.status_code == 200
+    assert len(queries) == 1
+    response, queries = token_queries(token_client)
+    assert response.status_code == 200
+    assert response.data['username'] == user.username
+    assert queries == []
+
+
+def test_logout_invalidates_cached_token(token_client):
+    assert token_client.get(ME_URL).status_code == 200
+    response = token_client.post('/api/auth/token/logout/')
+    assert response.status_code == 204
+    assert token_client.get(ME_URL).status_code == 401
+
+
+def test_deactivation_invalidates_cached_token(token_client, user):
+    assert token_client.get(ME_URL).status_code == 200
+    user.is_active = False
+    user.save()
+    assert token_client.get(ME_URL).status_code == 401
+
+
+def test_password_change_refreshes_cached_user(token_client, user):
+    assert token_client.get(ME_URL).status_code == 200
+    response = token_client.post(
+        '/api/users/set_password/',
+        {'current_password': 'password', 'new_password': 'Ne3w-pa55word'},
+    )
+    assert response.status_code == 204
+    response, queries = token_queries(token_client)
+    assert response.status_code == 200
+    assert len(queries) == 1
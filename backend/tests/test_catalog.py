@@ -0,0 +1,63 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+
+from api.async_views import async_view
+from api.mixins import get_catalog_version
+from api.views import IngredientViewSet, TagViewSet
+from recipes.models import Tag
+
+# Асинхронные представления работают в пуле потоков со своими
+# соединениями, которые не видят незафиксированных данных теста.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.mark.parametrize('viewset, path, fixture', (
+    (TagViewSet, '/api/tags/', 'tags'),
+    (IngredientViewSet, '/api/ingredients/', 'ingredients'),
+))
+def test_cached_list_through_async_view(request, viewset, path, fixture):
+    objects = request.getfixturevalue(fixture)
+    view = async_to_sync(async_view(viewset, {'get': 'list'}))
+    responses = [
+        view(RequestFactory().get(path, HTTP_ACCEPT='application/json'))
+        for _ in range(2)
+    ]
+    for response in responses:
+        assert response.status_code == 200
+        assert [item['id'] for item in json.loads(response.content)] == [
+            obj.id for obj in objects
+        ]
+    # Второй ответ отдан из кэша тем же содержимым.
+    assert responses[0].content == responses[1].content
+
+
+def test_catalog_version_follows_database(tags):
+    version = get_catalog_version(Tag)
+    tags[0].name = 'Новое имя'
+    tags[0].save()
+    changed = get_catalog_version(Tag)
+    assert changed != version
+    tags[1].delete()
+    assert get_catalog_version(Tag) not in (version, changed)
+
+
+def test_cached_list_sees_changes(anon_client, tags):
+    def names():
+        return {tag['name'] for tag in anon_client.get('/api/tags/').json()}
+
+    assert names() == {'Тэг 0', 'Тэг 1'}
+    tags[0].name = 'Новое имя'
+    tags[0].save()
+    assert names() == {'Новое имя', 'Тэг 1'}
+
+
+def test_nutrition_sees_ingredient_changes(anon_client, recipe, ingredients):
+    url = f'/api/recipes/{recipe.id}/'
+    calories = anon_client.get(url).data['nutrition']['calories']
+    ingredients[0].calories += 10
+    ingredients[0].save()
+    # Первый ингредиент входит в рецепт в количестве 1.
+    assert anon_client.get(url).data['nutrition']['calories'] == calories + 10
@@ -0,0 +1,67 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.changes import record_change
+from foodgram.transactions import OnCommitBatch
+from recipes.models import RecipeChange
+
+# Изменения записываются после фиксации транзакции.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+CHANGED, DELETED = RecipeChange.CHANGED, RecipeChange.DELETED
+
+
+class Rollback(Exception):
+    pass
+
+
+def rolled_back(func, *args):
+    try:
+        with transaction.atomic():
+            func(*args)
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def logged():
+    return list(
+        RecipeChange.objects.order_by('id').values_list('recipe_id', 'action')
+    )
+
+
+def test_nested_rollback_drops_changes():
+    with CaptureQueriesContext(connection) as context:
+        with transaction.atomic():
+            record_change(RecipeChange.RECIPE, 1, CHANGED)
+            rolled_back(record_change, RecipeChange.RECIPE, 2, CHANGED)
+            record_change(RecipeChange.RECIPE, 1, DELETED)
+            record_change(RecipeChange.RECIPE, 3, CHANGED)
+    assert [
+        query for query in context.captured_queries
+        if query['sql'].startswith('INSERT')
+    ] == context.captured_queries[-1:]
+    assert logged() == [(1, DELETED), (3, CHANGED)]
+
+
+def test_rolled_back_first_change_does_not_lose_later_ones():
+    with transaction.atomic():
+        rolled_back(record_change, RecipeChange.RECIPE, 1, CHANGED)
+        record_change(RecipeChange.RECIPE, 2, CHANGED)
+    rolled_back(record_change, RecipeChange.RECIPE, 3, CHANGED)
+    with transaction.atomic():
+        record_change(RecipeChange.RECIPE, 4, CHANGED)
+    record_change(RecipeChange.RECIPE, 5, CHANGED)
+    assert logged() == [(2, CHANGED), (4, CHANGED), (5, CHANGED)]
+
+
+def test_batch_calls_handler_once_per_transaction():
+    calls = []
+    batch = OnCommitBatch(calls.append)
+    with transaction.atomic():
+        batch.add(1)
+        with transaction.atomic():
+            batch.add(2)
+        batch.add(3)
+    assert calls == [[1, 2, 3]]
@@ -0,0 +1,54 @@
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+
+from recipes.models import RecipeChange
+
+# Под ASGI представление работает в другом потоке со своим соединением.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+URL = '/api/changes/stream/'
+
+
+@async_to_sync
+async def asgi_get(path):
+    return await AsyncClient().get(path)
+
+
+@pytest.fixture
+def change(settings):
+    settings.CHANGES = {
+        **settings.CHANGES,
+        'SAFETY_LAG': 0,
+        'STREAM_TIMEOUT': 0.5,
+        'STREAM_POLL_INTERVAL': 0.1,
+    }
+    return RecipeChange.objects.create(
+        kind=RecipeChange.RECIPE, action=RecipeChange.CHANGED, recipe_id=1
+    )
+
+
+def test_stream_closes_after_timeout(anon_client, change):
+    started = time.monotonic()
+    response = anon_client.get(URL, {'since': change.id - 1})
+    assert response.streaming
+    content = b''.join(response.streaming_content).decode()
+    assert time.monotonic() - started < 2
+    assert content.startswith('retry: 1000\n\n')
+    assert f'id: {change.id}\nevent: changes\n' in content
+
+
+def test_asgi_returns_single_page(change):
+    response = asgi_get(f'{URL}?since={change.id - 1}')
+    assert response.status_code == 200
+    assert not response.streaming
+    content = response.content.decode()
+    assert content.startswith('retry: 100\n\n')
+    assert f'id: {change.id}\nevent: changes\n' in content
+
+
+def test_asgi_empty_page_keeps_cursor(change):
+    response = asgi_get(f'{URL}?since={change.id}')
+    assert response.content.decode().endswith(f'id: {change.id}\n\n')
@@ -0,0 +1,16 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+
+def test_removes_only_unreferenced_recipe_images(recipe, tmp_path):
+    referenced = tmp_path / 'recipes' / 'recipe.png'
+    orphan = tmp_path / 'recipes' / 'ab' / 'orphan.png'
+    foreign = tmp_path / 'avatars' / 'user.png'
+    for path in (referenced, orphan, foreign):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'png')
+    call_command('cleanup_media', min_age=0, stdout=StringIO())
+    assert referenced.exists()
+    assert foreign.exists()
+    assert not orphan.exists()
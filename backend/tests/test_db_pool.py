@@ -0,0 +1,79 @@
+import threading
+
+from psycopg2 import extensions
+
+from foodgram.db_backends.postgresql.pool import ConnectionPool
+
+
+class FakeConnection:
+    closed = False
+
+    def __init__(self, ping=None):
+        self.ping = ping
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql):
+        if self.ping is not None:
+            self.ping()
+
+    def get_transaction_status(self):
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = True
+
+
+def test_health_check_does_not_block_other_checkouts():
+    pool = ConnectionPool(max_size=2, health_check_after=0)
+    ping_started = threading.Event()
+    release_ping = threading.Event()
+
+    def slow_ping():
+        ping_started.set()
+        release_ping.wait(5)
+
+    fast = pool.getconn(FakeConnection)
+    slow = pool.getconn(lambda: FakeConnection(slow_ping))
+    pool.putconn(fast)
+    pool.putconn(slow)
+    checked_out = []
+
+    def checkout():
+        checked_out.append(pool.getconn(FakeConnection))
+
+    first = threading.Thread(target=checkout)
+    first.start()
+    assert ping_started.wait(5)
+    # Пока одно соединение проверяется, второе выдаётся без ожидания.
+    second = threading.Thread(target=checkout)
+    second.start()
+    second.join(1)
+    assert checked_out == [fast]
+    release_ping.set()
+    first.join(5)
+    assert checked_out == [fast, slow]
+    assert pool.get_stats()['waits'] == 0
+
+
+def test_unusable_connection_is_replaced():
+    pool = ConnectionPool(max_size=1, health_check_after=0)
+
+    def broken_ping():
+        raise OSError
+
+    broken = pool.getconn(lambda: FakeConnection(broken_ping))
+    pool.putconn(broken)
+    connection = pool.getconn(FakeConnection)
+    assert connection is not broken
+    assert broken.closed
+    stats = pool.get_stats()
+    assert stats['failed_health_checks'] == 1
+    assert stats['size'] == 1
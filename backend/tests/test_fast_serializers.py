@@ -0,0 +1,60 @@
+import json
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fast_serializers import FastRecipeSerializer
+from api.serializers import RecipeSerializer
+from api.views import RecipeViewSet
+from recipes.models import Cart, Favorite
+from users.models import Subscribe
+
+
+def serialize(user):
+    request = Request(APIRequestFactory().get('/api/recipes/'))
+    request.user = user
+    view = RecipeViewSet(request=request, action='list', format_kwarg=None)
+    context = view.get_serializer_context()
+    queryset = view.get_queryset().order_by('id')
+    fast = FastRecipeSerializer(queryset, many=True, context=context).data
+    full = RecipeSerializer(queryset, many=True, context=context).data
+    # Сравниваются сериализованные в JSON данные, как их видит клиент.
+    return json.loads(json.dumps(fast)), json.loads(json.dumps(full))
+
+
+@pytest.fixture
+def recipes(make_recipe, author, user, tags, ingredients):
+    recipes = [
+        make_recipe('Избранное', author=author),
+        make_recipe('В корзине', author=author, tags=tags[:1]),
+        make_recipe('Без тегов', author=author, tags=[], ingredients=[]),
+        make_recipe('Свой', author=user, ingredients=ingredients[:1]),
+    ]
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    Cart.objects.create(user=user, recipe=recipes[1])
+    Cart.objects.create(user=user, recipe=recipes[0])
+    Subscribe.objects.create(user=user, author=author)
+    return recipes
+
+
+@pytest.mark.parametrize('as_user', (True, False))
+def test_fast_serializer_matches_recipe_serializer(recipes, user, as_user):
+    fast, full = serialize(user if as_user else AnonymousUser())
+    assert len(fast) == len(recipes)
+    assert fast == full
+
+
+def test_contract_covers_flags(recipes, user):
+    fast, _ = serialize(user)
+    assert [
+        (item['is_favorited'], item['is_in_shopping_cart'],
+         item['author']['is_subscribed'])
+        for item in fast
+    ] == [
+        (True, True, True),
+        (False, True, True),
+        (False, False, True),
+        (False, False, False),
+    ]
@@ -0,0 +1,72 @@
+import os
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import IngredientInRecipe, Recipe
+
+# ingredient_ids обновляется после фиксации транзакции.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def ingredient_ids(recipe):
+    recipe.refresh_from_db(fields=['ingredient_ids'])
+    return recipe.ingredient_ids
+
+
+def test_rows_update_ingredient_ids(recipe, ingredients):
+    IngredientInRecipe.objects.filter(
+        recipe=recipe, ingredient=ingredients[0]
+    ).delete()
+    assert ingredient_ids(recipe) == [item.id for item in ingredients[1:]]
+    with transaction.atomic():
+        IngredientInRecipe.objects.create(
+            recipe=recipe, ingredient=ingredients[0], amount=5
+        )
+        row = IngredientInRecipe.objects.get(
+            recipe=recipe, ingredient=ingredients[1]
+        )
+        row.delete()
+    assert ingredient_ids(recipe) == sorted(
+        item.id for item in ingredients if item != ingredients[1]
+    )
+
+
+def test_rolled_back_rows_do_not_refresh(recipe, make_recipe, ingredients):
+    other = make_recipe('Другой', ingredients=ingredients[:1])
+    with CaptureQueriesContext(connection) as context:
+        with transaction.atomic():
+            IngredientInRecipe.objects.create(
+                recipe=other, ingredient=ingredients[1], amount=1
+            )
+            try:
+                with transaction.atomic():
+                    IngredientInRecipe.objects.filter(recipe=recipe).delete()
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+    updates = [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('UPDATE')
+    ]
+    assert len(updates) == 1
+    assert f'IN ({other.id})' in updates[0]
+    assert ingredient_ids(recipe) == [item.id for item in ingredients]
+    assert ingredient_ids(other) == [item.id for item in ingredients[:2]]
+
+
+def test_loaddata_fills_ingredient_ids():
+    call_command(
+        'loaddata', os.path.join(settings.BASE_DIR, 'dump.json'),
+        stdout=StringIO()
+    )
+    recipes = Recipe.objects.prefetch_related('recipe')
+    assert recipes
+    for recipe in recipes:
+        assert recipe.ingredient_ids == sorted(
+            {item.ingredient_id for item in recipe.recipe.all()}
+        )
@@ -0,0 +1,132 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from django.db import connection, transaction
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import claim_job, enqueue, finish_job, run_job, task
+
+# Задачи ставятся в очередь после фиксации транзакции.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+calls = []
+
+
+@task(max_attempts=2)
+def remember(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def fail():
+    raise ValueError('ошибка')
+
+
+@pytest.fixture(autouse=True)
+def jobs_settings(settings):
+    settings.JOBS = {
+        **settings.JOBS, 'EAGER': False, 'BACKOFF_BASE': 10,
+        'LOCK_TIMEOUT': 60,
+    }
+    calls.clear()
+
+
+def make_job(func, **kwargs):
+    return Job.objects.create(
+        name=func.task_name, max_attempts=func.max_attempts, **kwargs
+    )
+
+
+def test_enqueue_runs_on_commit():
+    with transaction.atomic():
+        enqueue(remember, value=1)
+        assert not Job.objects.exists()
+    job = Job.objects.get()
+    assert (job.name, job.payload) == (remember.task_name, {'value': 1})
+    with pytest.raises(ValueError):
+        with transaction.atomic():
+            enqueue(remember, value=2)
+            raise ValueError
+    assert Job.objects.count() == 1
+
+
+def test_enqueue_collapses_pending_dedup_key():
+    for value in (1, 2):
+        enqueue(remember, dedup_key='key', value=value)
+    assert list(Job.objects.values_list('payload', flat=True)) == [
+        {'value': 1}
+    ]
+    Job.objects.update(status=Job.DONE)
+    enqueue(remember, dedup_key='key', value=3)
+    assert Job.objects.filter(status=Job.PENDING).count() == 1
+
+
+def test_claim_skips_locked_rows():
+    locked = make_job(remember, payload={'value': 1})
+    free = make_job(
+        remember, payload={'value': 2},
+        run_at=timezone.now() - timedelta(seconds=1)
+    )
+    # Первой по run_at идёт free: блокируется она, а забрать нужно locked.
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        with transaction.atomic():
+            Job.objects.select_for_update().get(id=free.id)
+            holding.set()
+            release.wait(5)
+        connection.close()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    try:
+        assert holding.wait(5)
+        job = claim_job()
+    finally:
+        release.set()
+        thread.join()
+    assert job.id == locked.id
+    assert (job.status, job.attempts) == (Job.RUNNING, 1)
+    assert job.locked_until > timezone.now()
+
+
+def test_failed_job_is_retried_with_backoff():
+    make_job(fail)
+    job = claim_job()
+    before = timezone.now()
+    run_job(job)
+    job.refresh_from_db()
+    assert job.status == Job.PENDING
+    assert 'ValueError' in job.last_error
+    assert job.locked_until is None
+    assert job.run_at >= before + timedelta(seconds=10)
+    assert claim_job() is None
+    Job.objects.update(run_at=timezone.now())
+    run_job(claim_job())
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.FAILED, 2)
+    assert job.finished_at is not None
+
+
+def test_retry_collapses_into_newer_pending_job():
+    job = make_job(remember, dedup_key='key', payload={'value': 1})
+    job = claim_job()
+    make_job(remember, dedup_key='key', payload={'value': 2})
+    finish_job(job, Job.PENDING, 'ошибка')
+    job.refresh_from_db()
+    assert job.status == Job.DONE
+
+
+def test_expired_lock_is_reclaimed():
+    job = make_job(remember, payload={'value': 1})
+    assert claim_job().id == job.id
+    assert claim_job() is None
+    Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+    job = claim_job()
+    assert (job.status, job.attempts) == (Job.RUNNING, 2)
+    run_job(job)
+    job.refresh_from_db()
+    assert job.status == Job.DONE
+    assert calls == [1]
@@ -0,0 +1,90 @@
+from datetime import date
+
+import pytest
+
+from api import meal_plans
+from api.meal_plans import get_plan_shopping_list
+from recipes.models import MealPlan, MealPlanEntry
+
+
+@pytest.fixture
+def plan(author, make_recipe, ingredients):
+    plan = MealPlan.objects.create(user=author, name='План')
+    first = make_recipe('Первый', ingredients=ingredients[:1])
+    second = make_recipe('Второй', ingredients=ingredients[1:2])
+    for day, recipe, servings in (
+        (1, first, 2), (2, first, 1), (2, second, 1), (3, second, 3)
+    ):
+        MealPlanEntry.objects.create(
+            plan=plan, recipe=recipe, date=date(2023, 1, day),
+            servings=servings
+        )
+    return plan
+
+
+@pytest.fixture
+def computed_days(monkeypatch):
+    days = []
+    get_days_rows = meal_plans.get_days_rows
+
+    def spy(entries, missing):
+        days.extend(missing)
+        return get_days_rows(entries, missing)
+
+    monkeypatch.setattr(meal_plans, 'get_days_rows', spy)
+    return days
+
+
+def test_servings_scale_amounts(plan):
+    # В каждом рецепте 1 г ингредиента на порцию.
+    assert get_plan_shopping_list(plan) == [
+        'Ингредиент 0 - 3 г', 'Ингредиент 1 - 4 г'
+    ]
+
+
+def test_date_range(plan):
+    assert get_plan_shopping_list(
+        plan, date_from=date(2023, 1, 2), date_to=date(2023, 1, 2)
+    ) == ['Ингредиент 0 - 1 г', 'Ингредиент 1 - 1 г']
+    assert get_plan_shopping_list(plan, date_from=date(2023, 1, 3)) == [
+        'Ингредиент 1 - 3 г'
+    ]
+    assert get_plan_shopping_list(plan, date_to=date(2023, 1, 1)) == [
+        'Ингредиент 0 - 2 г'
+    ]
+
+
+def test_edit_recomputes_only_its_day(plan, computed_days,
+                                      django_assert_num_queries):
+    get_plan_shopping_list(plan)
+    computed_days.clear()
+    # Версия справочника и ключи дней, строки берутся из кэша.
+    with django_assert_num_queries(2):
+        get_plan_shopping_list(plan)
+    assert computed_days == []
+    entry = plan.entries.get(date=date(2023, 1, 3))
+    entry.servings = 1
+    entry.save()
+    with django_assert_num_queries(3):
+        rows = get_plan_shopping_list(plan)
+    assert computed_days == [date(2023, 1, 3)]
+    assert rows == ['Ингредиент 0 - 3 г', 'Ингредиент 1 - 2 г']
+
+
+def test_delete_and_move_invalidate_days(plan, computed_days):
+    get_plan_shopping_list(plan)
+    computed_days.clear()
+    plan.entries.filter(date=date(2023, 1, 2)).first().delete()
+    assert get_plan_shopping_list(plan) == [
+        'Ингредиент 0 - 2 г', 'Ингредиент 1 - 4 г'
+    ]
+    assert computed_days == [date(2023, 1, 2)]
+    computed_days.clear()
+    entry = plan.entries.get(date=date(2023, 1, 1))
+    entry.date = date(2023, 1, 3)
+    entry.save()
+    assert get_plan_shopping_list(plan) == [
+        'Ингредиент 0 - 2 г', 'Ингредиент 1 - 4 г'
+    ]
+    assert computed_days == [date(2023, 1, 3)]
+    assert get_plan_shopping_list(plan, date_to=date(2023, 1, 1)) == []
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory
+from django.urls import path
+from django.utils.module_loading import import_string
+
+from api.query_budget import QueryBudgetExceeded, QueryBudgetMiddleware
+from foodgram import db_routers
+from foodgram.db_routers import ReplicaRoutingMiddleware
+from users.models import User
+
+PROJECT_MIDDLEWARE = [
+    name for name in settings.MIDDLEWARE
+    if name.startswith(('api.', 'foodgram.'))
+]
+
+
+async def slow_view(request):
+    await asyncio.sleep(0.5)
+    return HttpResponse('ok')
+
+
+urlpatterns = [path('slow/', slow_view)]
+
+
+async def async_ok(request):
+    return HttpResponse('ok')
+
+
+@pytest.mark.parametrize('name', PROJECT_MIDDLEWARE)
+def test_middleware_is_async_capable(name):
+    middleware = import_string(name)(async_ok)
+    assert asyncio.iscoroutinefunction(middleware)
+    request = RequestFactory().get('/api/tags/')
+    assert async_to_sync(middleware)(request).content == b'ok'
+
+
+def test_async_requests_run_concurrently(settings):
+    settings.ROOT_URLCONF = __name__
+
+    async def run():
+        client = AsyncClient()
+        return await asyncio.gather(
+            *(client.get('/slow/') for _ in range(4))
+        )
+
+    started = time.monotonic()
+    responses = async_to_sync(run)()
+    # Без async-совместимых middleware запросы шли бы по очереди, 2 с.
+    assert time.monotonic() - started < 1.5
+    assert all(response.status_code == 200 for response in responses)
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    monkeypatch.setattr(db_routers, 'get_replicas', lambda: ['replica1'])
+
+
+def route(request, is_async=False, status=200):
+    seen = []
+
+    def get_response(request):
+        seen.append(db_routers._use_replica.get())
+        return HttpResponse(status=status)
+
+    async def get_response_async(request):
+        return get_response(request)
+
+    if is_async:
+        middleware = ReplicaRoutingMiddleware(get_response_async)
+        response = async_to_sync(middleware)(request)
+    else:
+        response = ReplicaRoutingMiddleware(get_response)(request)
+    return seen[0], response
+
+
+@pytest.mark.parametrize('is_async', (False, True))
+def test_reads_stick_to_primary_after_write(replicas, is_async):
+    factory = RequestFactory()
+    use_replica, _ = route(factory.get('/api/recipes/'), is_async)
+    assert use_replica
+    use_replica, response = route(factory.post('/api/recipes/'), is_async)
+    assert not use_replica
+    cookie = response.cookies[db_routers.STICKY_COOKIE]
+    factory.cookies[cookie.key] = cookie.value
+    use_replica, _ = route(factory.get('/api/recipes/'), is_async)
+    assert not use_replica
+
+
+@pytest.mark.parametrize('is_async', (False, True))
+def test_token_reads_stick_to_primary_after_write(replicas, is_async):
+    # Клиент с токеном не хранит cookie.
+    factory = RequestFactory(HTTP_AUTHORIZATION='Token abc')
+    use_replica, _ = route(factory.post('/api/recipes/'), is_async)
+    assert not use_replica
+    use_replica, _ = route(factory.get('/api/recipes/'), is_async)
+    assert not use_replica
+    other = RequestFactory(HTTP_AUTHORIZATION='Token def')
+    use_replica, _ = route(other.get('/api/recipes/'), is_async)
+    assert use_replica
+
+
+@pytest.mark.parametrize('status', (400, 500))
+def test_failed_write_does_not_stick(replicas, status):
+    factory = RequestFactory(HTTP_AUTHORIZATION='Token abc')
+    _, response = route(factory.post('/api/recipes/'), status=status)
+    assert db_routers.STICKY_COOKIE not in response.cookies
+    use_replica, _ = route(factory.get('/api/recipes/'))
+    assert use_replica
+
+
+def test_no_sticky_cookie_without_replicas():
+    _, response = route(RequestFactory().post('/api/recipes/'))
+    assert db_routers.STICKY_COOKIE not in response.cookies
+
+
+@pytest.mark.django_db
+def test_query_budget_counts_queries_of_view_thread(settings):
+    settings.QUERY_BUDGET = {'ENABLED': True, 'RAISE': True, 'DEFAULT': 1}
+
+    async def view(request):
+        # Под ASGI представление работает в другом потоке со своим
+        # соединением с базой.
+        for _ in range(2):
+            await sync_to_async(User.objects.count, thread_sensitive=False)()
+        return HttpResponse()
+
+    middleware = QueryBudgetMiddleware(view)
+    with pytest.raises(QueryBudgetExceeded):
+        async_to_sync(middleware)(RequestFactory().get('/api/tags/'))
@@ -0,0 +1,90 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from recipes.models import Recipe
+
+# Команды работают в потоках со своими соединениями с базой.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def snapshot():
+    return [
+        (
+            recipe.id, recipe.author.email, recipe.name, recipe.pub_date,
+            recipe.image.name, recipe.ingredient_ids,
+            sorted(tag.slug for tag in recipe.tags.all()),
+            sorted(
+                (item.ingredient.name, item.amount)
+                for item in recipe.recipe.all()
+            ),
+        )
+        for recipe in Recipe.objects.order_by('id')
+    ]
+
+
+@pytest.fixture
+def recipes(make_recipe, tags, ingredients):
+    return [
+        make_recipe('Первый'),
+        make_recipe('Второй', tags=tags[:1], ingredients=ingredients[2:]),
+        make_recipe('Третий', tags=[], ingredients=[]),
+    ]
+
+
+def export(path, **options):
+    call_command('export_recipes', str(path), stdout=StringIO(), **options)
+    return path.read_bytes()
+
+
+def load(path, **options):
+    output = StringIO()
+    call_command('import_recipes', str(path), stdout=output, **options)
+    return output.getvalue()
+
+
+def test_round_trip(recipes, tmp_path):
+    expected = snapshot()
+    path = tmp_path / 'recipes.ndjson'
+    export(path, chunk_size=2)
+    Recipe.objects.all().delete()
+    assert 'Загружено рецептов: 3, пропущено: 0' in load(path)
+    assert snapshot() == expected
+
+
+def test_reimport_is_idempotent(recipes, tmp_path):
+    expected = snapshot()
+    path = tmp_path / 'recipes.ndjson'
+    export(path)
+    assert 'Загружено рецептов: 0, пропущено: 3' in load(path)
+    assert snapshot() == expected
+
+
+def test_resumed_export_truncates_partial_line(recipes, tmp_path):
+    path = tmp_path / 'recipes.ndjson'
+    lines = export(path).splitlines(keepends=True)
+    # Выгрузка прервалась на середине второй строки после первой пачки.
+    path.write_bytes(lines[0] + lines[1][:10])
+    checkpoint = tmp_path / 'checkpoint.json'
+    checkpoint.write_text(json.dumps({
+        str(path): {'last_id': recipes[0].id, 'offset': len(lines[0])}
+    }))
+    assert export(
+        path, chunk_size=1, checkpoint=str(checkpoint)
+    ) == b''.join(lines)
+
+
+def test_sequences_are_reset(recipes, make_recipe, tmp_path):
+    path = tmp_path / 'recipes.ndjson'
+    export(path)
+    Recipe.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence('recipes_recipe', 'id'), "
+            "%s, false)", [recipes[0].id]
+        )
+    load(path)
+    assert make_recipe('Новый').id == recipes[-1].id + 1
@@ -0,0 +1,106 @@
+import base64
+import io
+import json
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory
+
+from api.parsers import FastJSONParser, PayloadTooLarge
+from recipes.models import Recipe
+
+URL = '/api/recipes/'
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA'
+    '60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+@pytest.fixture
+def limits(settings):
+    settings.PAYLOAD_LIMITS = {
+        **settings.PAYLOAD_LIMITS,
+        'MAX_BODY_SIZE': 1000,
+        'MAX_INGREDIENTS': 2,
+    }
+    return settings.PAYLOAD_LIMITS
+
+
+def recipe_data(tags, ingredients, **kwargs):
+    return {
+        'name': 'Новый рецепт',
+        'text': 'Описание',
+        'cooking_time': 5,
+        'tags': [tags[0].id],
+        'ingredients': [{'id': ingredients[0].id, 'amount': 2}],
+        **kwargs,
+    }
+
+
+def test_content_length_over_limit(author_client, limits):
+    response = author_client.post(
+        URL, '{}', content_type='application/json', CONTENT_LENGTH='1001'
+    )
+    assert response.status_code == 413
+
+
+def test_body_without_content_length_over_limit(limits):
+    request = RequestFactory().post(URL)
+    del request.META['CONTENT_LENGTH']
+    stream = io.BytesIO(b'[' + b'1,' * 600 + b'1]')
+    with pytest.raises(PayloadTooLarge):
+        FastJSONParser().parse(stream, parser_context={'request': request})
+
+
+def test_too_many_ingredients(author_client, limits, tags, ingredients,
+                              django_assert_num_queries):
+    data = recipe_data(tags, ingredients)
+    data['ingredients'] = [
+        {'id': ingredient.id, 'amount': 1} for ingredient in ingredients[:3]
+    ]
+    with django_assert_num_queries(0):
+        response = author_client.post(URL, data, format='json')
+    assert response.status_code == 400
+    assert 'ingredients' in response.data
+
+
+def test_base64_image_over_limit(author_client, limits, tags, ingredients,
+                                 settings):
+    settings.PAYLOAD_LIMITS = {**limits, 'MAX_IMAGE_SIZE': len(PNG) - 1}
+    image = 'data:image/png;base64,' + base64.b64encode(PNG).decode()
+    response = author_client.post(
+        URL, recipe_data(tags, ingredients, image=image), format='json'
+    )
+    assert response.status_code == 400
+    assert 'Размер изображения' in str(response.data['image'])
+
+
+def multipart_data(tags, ingredients):
+    return {
+        'data': json.dumps(recipe_data(tags, ingredients)),
+        'image': SimpleUploadedFile('recipe.png', PNG, 'image/png'),
+    }
+
+
+def test_multipart_image_over_limit(author_client, tags, ingredients,
+                                    settings):
+    settings.PAYLOAD_LIMITS = {
+        **settings.PAYLOAD_LIMITS, 'MAX_IMAGE_SIZE': len(PNG) - 1
+    }
+    response = author_client.post(
+        URL, multipart_data(tags, ingredients), format='multipart'
+    )
+    assert response.status_code == 400
+    assert 'Размер изображения' in str(response.data['image'])
+
+
+def test_multipart_create(author_client, author, tags, ingredients):
+    response = author_client.post(
+        URL, multipart_data(tags, ingredients), format='multipart'
+    )
+    assert response.status_code == 201, response.data
+    recipe = Recipe.objects.get(id=response.data['id'])
+    assert recipe.author == author
+    assert recipe.image.read() == PNG
+    assert list(recipe.tags.all()) == tags[:1]
+    assert recipe.ingredient_ids == [ingredients[0].id]
@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+
+from api import profiling
+from api.async_views import async_view
+from api.profiling import ProfilingMiddleware
+
+
+class FakeSampler:
+    def __init__(self):
+        self.active = {}
+
+    def start(self, view_name):
+        self.active[threading.get_ident()] = view_name
+
+    def stop(self, ident):
+        self.active.pop(ident)
+
+
+class ThreadViewSet(ViewSet):
+    threads = []
+
+    def list(self, request):
+        self.threads.append(threading.get_ident())
+        self.threads.append(dict(profiling.get_sampler().active))
+        return Response()
+
+
+@pytest.fixture
+def sampler(settings, monkeypatch):
+    settings.PROFILING = {**settings.PROFILING, 'ENABLED': True, 'RATE': 1}
+    sampler = FakeSampler()
+    monkeypatch.setattr(profiling, '_sampler', sampler)
+    ThreadViewSet.threads = []
+    return sampler
+
+
+def test_async_view_registers_its_own_thread(sampler):
+    view = async_view(ThreadViewSet, {'get': 'list'})
+
+    async def get_response(request):
+        # Как обработчик Django: process_view, затем представление.
+        middleware.process_view(request, view, (), {})
+        return await view(request)
+
+    middleware = ProfilingMiddleware(get_response)
+    response = async_to_sync(middleware)(RequestFactory().get('/api/'))
+    assert response.status_code == 200
+    thread, active = ThreadViewSet.threads
+    assert active == {thread: 'ThreadViewSet.list'}
+    assert sampler.active == {}
+
+
+def test_sync_view_is_registered_by_middleware(sampler):
+    def view(request):
+        ThreadViewSet.threads.append(dict(sampler.active))
+        return HttpResponse()
+
+    def get_response(request):
+        middleware.process_view(request, view, (), {})
+        return view(request)
+
+    middleware = ProfilingMiddleware(get_response)
+    middleware(RequestFactory().get('/api/'))
+    assert ThreadViewSet.threads == [
+        {threading.get_ident(): f'{__name__}.view'}
+    ]
+    assert sampler.active == {}
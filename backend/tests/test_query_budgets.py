@@ -0,0 +1,195 @@
+import pytest
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from api import urls
+from recipes.models import Cart, Favorite, MealPlan, MealPlanEntry
+from users.models import Subscribe, User
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+def recipe_data(world):
+    return {
+        'name': 'Новый рецепт',
+        'text': 'Описание',
+        'cooking_time': 5,
+        'image': IMAGE,
+        'tags': [world['tag']],
+        'ingredients': [
+            {'id': world['ingredient'], 'amount': 2},
+        ],
+    }
+
+
+def recipe_ids(world):
+    return {'ids': world['recipes']}
+
+
+def entry_data(world):
+    return {'date': '2023-02-01', 'recipe': world['recipe'], 'servings': 2}
+
+
+# Имя маршрута, метод, аргументы URL и тело запроса
+CASES = (
+    ('api-root', 'get', {}, None),
+    ('ingredients-list', 'get', {}, None),
+    ('ingredients-detail', 'get', {'pk': 'ingredient'}, None),
+    ('tags-list', 'get', {}, None),
+    ('tags-detail', 'get', {'pk': 'tag'}, None),
+    ('recipes-list', 'get', {}, None),
+    ('recipes-list', 'post', {}, recipe_data),
+    ('recipes-detail', 'get', {'pk': 'recipe'}, None),
+    ('recipes-detail', 'put', {'pk': 'recipe'}, recipe_data),
+    ('recipes-detail', 'patch', {'pk': 'recipe'}, recipe_data),
+    ('recipes-detail', 'delete', {'pk': 'recipe'}, None),
+    ('cart', 'post', {'id': 'new_recipe'}, None),
+    ('cart', 'delete', {'id': 'recipe'}, None),
+    ('favorite', 'post', {'id': 'new_recipe'}, None),
+    ('favorite', 'delete', {'id': 'recipe'}, None),
+    ('cart_bulk', 'post', {}, recipe_ids),
+    ('cart_bulk', 'delete', {}, recipe_ids),
+    ('favorite_bulk', 'post', {}, recipe_ids),
+    ('favorite_bulk', 'delete', {}, recipe_ids),
+    ('similar_recipes', 'get', {'id': 'recipe'}, None),
+    ('recommended_recipes', 'get', {}, None),
+    ('download_cart', 'get', {}, None),
+    ('subscribe', 'post', {'id': 'new_author'}, None),
+    ('subscribe', 'delete', {'id': 'followed'}, None),
+    ('subscribe_bulk', 'post', {},
+     lambda world: {'ids': [world['new_author']]}),
+    ('subscribe_bulk', 'delete', {},
+     lambda world: {'ids': [world['followed']]}),
+    ('subscriptions', 'get', {}, None),
+    ('meal_plans-list', 'get', {}, None),
+    ('meal_plans-list', 'post', {}, lambda world: {'name': 'План'}),
+    ('meal_plans-detail', 'get', {'pk': 'plan'}, None),
+    ('meal_plans-detail', 'patch', {'pk': 'plan'},
+     lambda world: {'name': 'Другой план'}),
+    ('meal_plans-detail', 'delete', {'pk': 'plan'}, None),
+    ('meal_plan_entries-list', 'get', {'plan_id': 'plan'}, None),
+    ('meal_plan_entries-list', 'post', {'plan_id': 'plan'}, entry_data),
+    ('meal_plan_entries-detail', 'get',
+     {'plan_id': 'plan', 'pk': 'entry'}, None),
+    ('meal_plan_entries-detail', 'patch',
+     {'plan_id': 'plan', 'pk': 'entry'}, lambda world: {'servings': 3}),
+    ('meal_plan_entries-detail', 'delete',
+     {'plan_id': 'plan', 'pk': 'entry'}, None),
+    ('meal_plan_shopping_list', 'get', {'id': 'plan'}, None),
+    ('changes', 'get', {}, None),
+    ('changes_stream', 'get', {}, None),
+    ('db_pool_stats', 'get', {}, None),
+    ('profiling', 'get', {}, None),
+    ('user-list', 'get', {}, None),
+    ('user-list', 'post', {}, lambda world: {
+        'email': 'new@example.com', 'username': 'new', 'first_name': 'new',
+        'last_name': 'new', 'password': 'Ne3w-pa55word',
+    }),
+    ('user-me', 'get', {}, None),
+    ('user-detail', 'get', {'id': 'followed'}, None),
+    ('user-set-password', 'post', {}, lambda world: {
+        'current_password': 'password', 'new_password': 'Ne3w-pa55word',
+    }),
+    ('user-activation', 'post', {}, None),
+    ('user-resend-activation', 'post', {}, None),
+    ('user-reset-password', 'post', {}, None),
+    ('user-reset-password-confirm', 'post', {}, None),
+    ('user-reset-username', 'post', {}, None),
+    ('user-reset-username-confirm', 'post', {}, None),
+    ('user-set-username', 'post', {}, None),
+    ('login', 'post', {}, lambda world: {
+        'email': 'author@example.com', 'password': 'password',
+    }),
+    ('logout', 'post', {}, None),
+)
+
+
+# Запросы, на которые API отвечает 400: пустые тела для действий djoser
+# с письмами и PUT рецепта, который принимает только PATCH-сериализатор.
+REJECTED = {
+    ('recipes-detail', 'put'),
+    ('user-activation', 'post'),
+    ('user-resend-activation', 'post'),
+    ('user-reset-password', 'post'),
+    ('user-reset-password-confirm', 'post'),
+    ('user-reset-username', 'post'),
+    ('user-reset-username-confirm', 'post'),
+    ('user-set-username', 'post'),
+}
+
+
+def get_route_names(patterns):
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            yield from get_route_names(pattern.url_patterns)
+        else:
+            yield pattern.name
+
+
+@pytest.fixture
+def world(settings, make_recipe, author, user, tags, ingredients):
+    settings.CHANGES = {**settings.CHANGES, 'STREAM_TIMEOUT': 0}
+    author.is_staff = True
+    author.save()
+    recipes = [make_recipe(f'Рецепт {i}') for i in range(5)]
+    followed = User.objects.create_user(
+        username='followed', email='followed@example.com', password='password'
+    )
+    for recipe in recipes[:3]:
+        Favorite.objects.create(user=author, recipe=recipe)
+        Cart.objects.create(user=author, recipe=recipe)
+    for recipe in (make_recipe(author=followed), make_recipe(author=user)):
+        recipes.append(recipe)
+    Subscribe.objects.create(user=author, author=followed)
+    plan = MealPlan.objects.create(user=author, name='План')
+    entries = [
+        MealPlanEntry.objects.create(
+            plan=plan, recipe=recipe, date=f'2023-01-0{i + 1}'
+        )
+        for i, recipe in enumerate(recipes[:3])
+    ]
+    return {
+        'recipe': recipes[0].id,
+        'new_recipe': recipes[4].id,
+        'recipes': [recipe.id for recipe in recipes],
+        'ingredient': ingredients[0].id,
+        'tag': tags[0].id,
+        'followed': followed.id,
+        'new_author': user.id,
+        'plan': plan.id,
+        'entry': entries[0].id,
+    }
+
+
+def test_every_route_is_checked():
+    names = set(get_route_names(urls.urlpatterns))
+    assert names == {name for name, *_ in CASES}
+
+
+@pytest.mark.parametrize(
+    'name, method, kwargs, data', CASES,
+    ids=[f'{method} {name}' for name, method, *_ in CASES]
+)
+def test_query_budget(author_client, world, name, method, kwargs, data):
+    url = reverse(
+        f'api:{name}',
+        kwargs={key: world[value] for key, value in kwargs.items()}
+    )
+    budgets = getattr(resolve(url).func.cls, 'query_budgets', {})
+    budget = budgets.get(method.upper(), settings.QUERY_BUDGET['DEFAULT'])
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(author_client, method)(
+            url, data and data(world), format='json'
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+    expected = (400,) if (name, method) in REJECTED else range(200, 300)
+    assert response.status_code in expected
+    assert len(context.captured_queries) <= budget, '\n'.join(
+        query['sql'] for query in context.captured_queries
+    )
@@ -0,0 +1,69 @@
+import pytest
+
+from recipes.models import Cart, Favorite, Recipe, RecipeSimilarity
+from recipes.recommendations import (build_similarity, get_recommended_recipes,
+                                     get_similar_recipes, get_stale_recipes)
+from users.models import User
+
+
+@pytest.fixture
+def recipes(make_recipe, user, author, tags):
+    recipes = [
+        make_recipe(f'Рецепт {i}', tags=[], ingredients=[]) for i in range(4)
+    ]
+    # Косинус по избранному: 0–1 — 1.0, 0–2 и 1–2 — 0.71.
+    for owner, favorites in ((user, recipes[:2]), (author, recipes[:3])):
+        for recipe in favorites:
+            Favorite.objects.create(user=owner, recipe=recipe)
+    # Общий тег 0–3: Жаккар 1.0 с весом 0.2.
+    for recipe in (recipes[0], recipes[3]):
+        recipe.tags.add(tags[0])
+    return recipes
+
+
+def neighbours(recipe):
+    return list(get_similar_recipes(recipe.id))
+
+
+def test_neighbours_are_ordered_by_score(recipes):
+    assert build_similarity(Recipe.objects.values_list('id', flat=True)) == 4
+    first, second, third, fourth = recipes
+    assert neighbours(first) == [second, third, fourth]
+    assert neighbours(fourth) == [first]
+    scores = dict(
+        RecipeSimilarity.objects.filter(recipe=first)
+        .values_list('similar', 'score')
+    )
+    assert scores[second.id] == pytest.approx(1.0)
+    assert scores[third.id] == pytest.approx(2 ** -0.5)
+    assert scores[fourth.id] == pytest.approx(0.2)
+
+
+def test_top_k(recipes):
+    build_similarity([recipe.id for recipe in recipes], top_k=2)
+    assert neighbours(recipes[0]) == recipes[1:3]
+    assert RecipeSimilarity.objects.filter(recipe=recipes[0]).count() == 2
+
+
+def test_incremental_run(recipes, user):
+    assert list(get_stale_recipes()) == [recipe.id for recipe in recipes]
+    build_similarity(get_stale_recipes())
+    assert list(get_stale_recipes()) == []
+    # Избранное не меняет рецепт, инкрементальный расчёт его не видит.
+    Favorite.objects.create(user=user, recipe=recipes[3])
+    assert list(get_stale_recipes()) == []
+    recipes[3].save()
+    # Изменённый рецепт и рецепт, у которого он был в соседях.
+    assert list(get_stale_recipes()) == [recipes[0].id, recipes[3].id]
+    assert build_similarity(get_stale_recipes()) == 2
+
+
+def test_recommendations_exclude_own_recipes(recipes):
+    build_similarity([recipe.id for recipe in recipes])
+    reader = User.objects.create_user(
+        username='reader', email='reader@example.com', password='password'
+    )
+    Favorite.objects.create(user=reader, recipe=recipes[0])
+    assert list(get_recommended_recipes(reader)) == recipes[1:]
+    Cart.objects.create(user=reader, recipe=recipes[2])
+    assert list(get_recommended_recipes(reader)) == [recipes[1], recipes[3]]
@@ -0,0 +1,103 @@
+import pytest
+
+from recipes.models import Cart, Favorite, RecipeChange
+from users.models import Subscribe
+
+# Журнал изменений пишется после фиксации транзакции, поэтому запросы
+# считаются с настоящими транзакциями.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+RELATIONS = (
+    ('favorite', Favorite),
+    ('shopping_cart', Cart),
+)
+
+
+@pytest.mark.parametrize('url_name, model', RELATIONS)
+def test_post(user_client, user, recipe, url_name, model,
+              django_assert_num_queries):
+    url = f'/api/recipes/{recipe.id}/{url_name}/'
+    # Проверка рецепта, INSERT и запись в журнал.
+    with django_assert_num_queries(3):
+        response = user_client.post(url)
+    assert response.status_code == 201
+    assert response.data['id'] == recipe.id
+    with django_assert_num_queries(2):
+        response = user_client.post(url)
+    assert response.status_code == 400
+    assert model.objects.filter(user=user, recipe=recipe).count() == 1
+
+
+@pytest.mark.parametrize('url_name, model', RELATIONS)
+def test_delete(user_client, user, recipe, url_name, model,
+                django_assert_num_queries):
+    model.objects.create(user=user, recipe=recipe)
+    RecipeChange.objects.all().delete()
+    url = f'/api/recipes/{recipe.id}/{url_name}/'
+    # Выборка удаляемых строк для post_delete, DELETE и запись в журнал.
+    with django_assert_num_queries(3):
+        response = user_client.delete(url)
+    assert response.status_code == 204
+    assert not model.objects.filter(user=user, recipe=recipe).exists()
+    assert list(RecipeChange.objects.values_list(
+        'recipe_id', 'user_id', 'action'
+    )) == [(recipe.id, user.id, RecipeChange.DELETED)]
+    with django_assert_num_queries(2):
+        response = user_client.delete(url)
+    assert response.status_code == 400
+    with django_assert_num_queries(2):
+        response = user_client.delete(f'/api/recipes/{recipe.id + 1}/'
+                                      f'{url_name}/')
+    assert response.status_code == 404
+
+
+def test_subscribe_delete(user_client, user, author,
+                          django_assert_num_queries):
+    Subscribe.objects.create(user=user, author=author)
+    url = f'/api/users/{author.id}/subscribe/'
+    with django_assert_num_queries(1):
+        response = user_client.delete(url)
+    assert response.status_code == 204
+    with django_assert_num_queries(2):
+        response = user_client.delete(url)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('url_name, model', RELATIONS)
+def test_bulk(user_client, user, make_recipe, url_name, model,
+              django_assert_num_queries):
+    recipes = [make_recipe(name=f'Рецепт {i}') for i in range(3)]
+    ids = [recipe.id for recipe in recipes]
+    model.objects.create(user=user, recipe=recipes[0])
+    url = f'/api/recipes/{url_name}/'
+    with django_assert_num_queries(4):
+        response = user_client.post(
+            url, {'ids': ids + [ids[-1] + 1]}, format='json'
+        )
+    assert [item['status'] for item in response.data['results']] == [
+        'exists', 'created', 'created', 'not_found'
+    ]
+    RecipeChange.objects.all().delete()
+    with django_assert_num_queries(4):
+        response = user_client.delete(
+            url, {'ids': ids[:2] + [ids[-1] + 1]}, format='json'
+        )
+    assert [item['status'] for item in response.data['results']] == [
+        'deleted', 'deleted', 'not_found'
+    ]
+    assert list(
+        model.objects.filter(user=user).values_list('recipe', flat=True)
+    ) == [ids[2]]
+    assert sorted(RecipeChange.objects.values_list(
+        'recipe_id', 'action'
+    )) == [(id, RecipeChange.DELETED) for id in sorted(ids[:2])]
+
+
+@pytest.mark.parametrize('url_name, model', RELATIONS)
+def test_orm_delete_is_logged(user, recipe, url_name, model):
+    model.objects.create(user=user, recipe=recipe)
+    RecipeChange.objects.all().delete()
+    model.objects.filter(user=user).delete()
+    assert list(RecipeChange.objects.values_list(
+        'recipe_id', 'user_id', 'action'
+    )) == [(recipe.id, user.id, RecipeChange.DELETED)]
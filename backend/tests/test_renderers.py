@@ -0,0 +1,58 @@
+import io
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from api import parsers, renderers
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+
+DATA = {
+    'decimal': Decimal('1.50'),
+    'datetime': datetime(2023, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+    'milliseconds': datetime(2023, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc),
+    'offset': datetime(
+        2023, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=3))
+    ),
+    'naive': datetime(2023, 1, 2, 3, 4, 5),
+    'date': date(2023, 1, 2),
+    'lazy': gettext_lazy('Рецепт'),
+    'separators': 'строка\u2028абзац\u2029',
+    'nested': [{1: 'один', 2.5: None}, True, 0.1],
+}
+
+
+@pytest.fixture
+def no_orjson(monkeypatch):
+    monkeypatch.setattr(renderers, 'orjson', None)
+    monkeypatch.setattr(parsers, 'orjson', None)
+
+
+def test_matches_stock_renderer():
+    assert renderers.orjson is not None
+    rendered = FastJSONRenderer().render(DATA)
+    assert rendered == JSONRenderer().render(DATA)
+    assert b'"2023-01-02T03:04:05.678901Z"' in rendered
+    assert b'"2023-01-02T03:04:05.678000Z"' in rendered
+    assert b'\\u2028' in rendered and b'\\u2029' in rendered
+
+
+def test_fallback_without_orjson(no_orjson):
+    assert FastJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+
+@pytest.mark.parametrize('use_orjson', (True, False))
+def test_parser(request, use_orjson):
+    if not use_orjson:
+        request.getfixturevalue('no_orjson')
+    parse = FastJSONParser().parse
+    context = {'request': type('Request', (), {'META': {}})()}
+    assert parse(
+        io.BytesIO('{"a": [1, "б"]}'.encode()), parser_context=context
+    ) == {'a': [1, 'б']}
+    with pytest.raises(ParseError):
+        parse(io.BytesIO(b'{"a": '), parser_context=context)
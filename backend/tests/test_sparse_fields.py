@@ -0,0 +1,29 @@
+import pytest
+
+URL = '/api/recipes/'
+
+
+def test_expand_requires_field(anon_client, recipe):
+    response = anon_client.get(URL, {'fields': 'id', 'expand': 'author'})
+    assert response.status_code == 400
+    assert 'expand' in response.data
+
+
+@pytest.mark.parametrize('url', (URL, '/api/recipes/{id}/'))
+def test_expanded_author(anon_client, recipe, author, url):
+    response = anon_client.get(
+        url.format(id=recipe.id), {'fields': 'author', 'expand': 'author'}
+    )
+    assert response.status_code == 200
+    data = response.data['results'][0] if url == URL else response.data
+    assert data['author']['username'] == author.username
+    assert data['author']['is_subscribed'] is False
+
+
+def test_collapsed_fields(anon_client, recipe, author, tags, ingredients):
+    response = anon_client.get(URL, {'fields': 'author,tags,ingredients'})
+    assert response.status_code == 200
+    data = response.data['results'][0]
+    assert data['author'] == author.id
+    assert data['tags'] == [tag.id for tag in tags]
+    assert data['ingredients'][0] == {'id': ingredients[0].id, 'amount': 1}
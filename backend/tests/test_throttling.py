@@ -0,0 +1,72 @@
+import pytest
+
+from api import throttling
+from api.throttling import take_tokens
+
+URL = '/api/tags/'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(settings, monkeypatch):
+    settings.THROTTLING = {
+        **settings.THROTTLING,
+        'ENABLED': True,
+        'BACKEND': 'local',
+        'USER': {'CAPACITY': 10, 'RATE': 1},
+        'ANON': {'CAPACITY': 2, 'RATE': 0.5},
+    }
+    clock = Clock()
+    monkeypatch.setattr(throttling, '_buckets', None)
+    monkeypatch.setattr(throttling.time, 'time', clock)
+    return clock
+
+
+def test_take_tokens_refills():
+    state, wait = take_tokens(None, 0, 3, 3, 1)
+    assert (state, wait) == ((0, 0), 0)
+    state, wait = take_tokens(state, 1, 2, 3, 1)
+    assert (state, wait) == ((1, 1), 1)
+    # Ведро не переполняется сверх capacity.
+    state, wait = take_tokens(state, 100, 1, 3, 1)
+    assert (state, wait) == ((2, 100), 0)
+
+
+def test_view_cost(user_client, clock, db):
+    response = user_client.get('/api/ingredients/')
+    assert response.status_code == 200
+    assert response['RateLimit-Limit'] == '10'
+    assert response['RateLimit-Remaining'] == '8'
+    response = user_client.get(URL)
+    assert response['RateLimit-Remaining'] == '7'
+
+
+def test_exhausted_bucket_returns_retry_after(anon_client, clock, db):
+    for _ in range(2):
+        assert anon_client.get(URL).status_code == 200
+    response = anon_client.get(URL)
+    assert response.status_code == 429
+    assert response['Retry-After'] == '2'
+    clock.now += 2
+    assert anon_client.get(URL).status_code == 200
+
+
+def test_anon_keyed_on_address_added_by_proxy(anon_client, clock, db):
+    for spoofed in ('1.1.1.1', '2.2.2.2'):
+        response = anon_client.get(
+            URL, HTTP_X_FORWARDED_FOR=f'{spoofed}, 10.0.0.1'
+        )
+        assert response.status_code == 200
+    response = anon_client.get(
+        URL, HTTP_X_FORWARDED_FOR='3.3.3.3, 10.0.0.1'
+    )
+    assert response.status_code == 429
+    response = anon_client.get(URL, HTTP_X_FORWARDED_FOR='10.0.0.2')
+    assert response.status_code == 200
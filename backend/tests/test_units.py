@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+import pytest
+
+from recipes.units import build_shopping_list
+
+
+@pytest.mark.parametrize('rows, expected', (
+    (
+        [('Мука', 'г', Decimal(500)), ('мука ', 'кг', Decimal('1.5'))],
+        ['Мука - 2 кг'],
+    ),
+    (
+        [('Молоко', 'мл', Decimal(200)), ('Молоко', 'стакан', Decimal(1))],
+        ['Молоко - 450 мл'],
+    ),
+    (
+        [('Сахар', 'ст. л.', Decimal(2)), ('Сахар', 'ст. л.', Decimal(1))],
+        ['Сахар - 3 ст. л.'],
+    ),
+    (
+        [('Яйца', 'шт.', Decimal(2)), ('Яйца', 'г', Decimal(50))],
+        ['Яйца - 50 г', 'Яйца - 2 шт.'],
+    ),
+    (
+        [('Соль', 'по вкусу', Decimal(1)), ('Соль', 'по вкусу', Decimal(3))],
+        ['Соль - по вкусу'],
+    ),
+))
+def test_build_shopping_list(rows, expected):
+    assert build_shopping_list(rows) == expected
+
+
+def test_cart_download(user_client, user, recipe):
+    user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    response = user_client.get('/api/recipes/download_shopping_cart/')
+    assert response.status_code == 200
+    text = response.content.decode()
+    assert 'Ингредиент 0 - 1 г' in text
+    assert 'Калорийность: 30.0 ккал' in text
@@ -5,13 +5,14 @@ from .models import Subscribe, User
 
 class UserAdmin(admin.ModelAdmin):
     list_display = ('username', 'first_name', 'last_name', 'email')
-    search_fields = ('username', 'first_name', 'last_name', 'username')
-    list_filter = ('first_name', 'email')
+    search_fields = ('username', 'first_name', 'last_name', 'email')
     empty_value_display = '-пусто-'
 
 
 class SubscribeAdmin(admin.ModelAdmin):
     list_display = ('user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
     empty_value_display = '-пусто-'
 
 